@@ -1,3 +1,24 @@
 __version__ = "0.0.5"
-from .webscraper import albertaC19
-from .analysis import *
+
+import importlib
+
+# the submodules pull in pandas, numpy and requests so they are only imported the first
+# time one of their names is used. This keeps `import covid_alberta` and the cli fast
+_lazy_names = {'albertaC19': 'webscraper',
+               'seriesStore': 'store',
+               'snapshotCache': 'cache',
+               'calculate_doublingtimes': 'analysis',
+               'enable_doublingtime_cache': 'analysis',
+               'doublingtimeTracker': 'analysis'}
+
+__all__ = list(_lazy_names)
+
+def __getattr__(name):
+    if name not in _lazy_names:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{_lazy_names[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()).union(__all__))
@@ -2,11 +2,73 @@
 
 __all__ = ["index", "modules", "custom_doc_links", "git_url"]
 
-index = {"albertaC19": "00_webscraper.ipynb",
-         "calculate_doublingtimes": "01_analysis.ipynb"}
+index = {"get_session": "00_webscraper.ipynb",
+         "extract_section_scripts": "00_webscraper.ipynb",
+         "read_dataframe": "00_webscraper.ipynb",
+         "write_modes": "00_webscraper.ipynb",
+         "compressions": "00_webscraper.ipynb",
+         "traces_to_frame": "00_webscraper.ipynb",
+         "widgetExtractor": "00_webscraper.ipynb",
+         "widget_specs": "00_webscraper.ipynb",
+         "albertaC19": "00_webscraper.ipynb",
+         "calculate_doublingtimes": "01_analysis.ipynb",
+         "doublingtimeCache": "01_analysis.ipynb",
+         "enable_doublingtime_cache": "01_analysis.ipynb",
+         "disable_doublingtime_cache": "01_analysis.ipynb",
+         "rolling_metrics": "01_analysis.ipynb",
+         "calculate_cumulatives": "01_analysis.ipynb",
+         "derived_metrics": "01_analysis.ipynb",
+         "derived_specs": "01_analysis.ipynb",
+         "downcast_integers": "01_analysis.ipynb",
+         "wide_to_long": "01_analysis.ipynb",
+         "calculate_doublingtimes_chunked": "01_analysis.ipynb",
+         "read_doublingtime_blocks": "01_analysis.ipynb",
+         "doublingtimeTracker": "01_analysis.ipynb",
+         "seriesStore": "02_store.ipynb",
+         "snapshotCache": "03_cache.ipynb",
+         "find_html_files": "04_backfill.ipynb",
+         "file_vintage": "04_backfill.ipynb",
+         "merge_vintages": "04_backfill.ipynb",
+         "backfill": "04_backfill.ipynb",
+         "measure": "05_benchmark.ipynb",
+         "synthetic_cumulative": "05_benchmark.ipynb",
+         "synthetic_page": "05_benchmark.ipynb",
+         "run_benchmarks": "05_benchmark.ipynb",
+         "compare_benchmarks": "05_benchmark.ipynb",
+         "doublingtimes_scaling": "05_benchmark.ipynb",
+         "url_folder": "06_asyncscraper.ipynb",
+         "asyncAlbertaC19": "06_asyncscraper.ipynb",
+         "diff_frames": "07_watch.ipynb",
+         "print_event": "07_watch.ipynb",
+         "dashboardWatcher": "07_watch.ipynb",
+         "watch": "07_watch.ipynb",
+         "make_parser": "08_cli.ipynb",
+         "main": "08_cli.ipynb",
+         "timed_stage": "09_instrument.ipynb",
+         "metricsRecorder": "09_instrument.ipynb",
+         "prometheusTextfile": "09_instrument.ipynb",
+         "downsample": "10_report.ipynb",
+         "frame_hash": "10_report.ipynb",
+         "daily_cases_figure": "10_report.ipynb",
+         "doubling_time_figure": "10_report.ipynb",
+         "report_charts": "10_report.ipynb",
+         "reportBuilder": "10_report.ipynb",
+         "dataSnapshot": "11_server.ipynb",
+         "seriesServer": "11_server.ipynb",
+         "serve": "11_server.ipynb"}
 
 modules = ["webscraper.py",
-           "analysis.py"]
+           "analysis.py",
+           "store.py",
+           "cache.py",
+           "backfill.py",
+           "benchmark.py",
+           "asyncscraper.py",
+           "watch.py",
+           "cli.py",
+           "instrument.py",
+           "report.py",
+           "server.py"]
 
 doc_url = "https://tyleracorn.github.io/covid_alberta/"
 
@@ -1,14 +1,110 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: 01_analysis.ipynb (unless otherwise specified).
 
-__all__ = ['calculate_doublingtimes']
+__all__ = ['calculate_doublingtimes', 'doublingtimeCache', 'enable_doublingtime_cache', 'disable_doublingtime_cache',
+           'rolling_metrics', 'calculate_cumulatives', 'derived_metrics', 'derived_specs', 'downcast_integers',
+           'wide_to_long', 'calculate_doublingtimes_chunked', 'read_doublingtime_blocks', 'doublingtimeTracker']
 
 # Cell
+import os
+import json
+import hashlib
+import threading
+from collections import deque, OrderedDict
+from pathlib import Path
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 
 # Cell
+_ns_per_day = 24 * 60 * 60 * 10**9 # timestamps are stored as int64 nanoseconds
+
+def _doublingtimes_array(cum_values:np.ndarray, date_ns:np.ndarray, median_incub_prd:float):
+    '''
+    utility function that does the doubling time math for every column of a 2-D array in one pass.
+    `cum_values` is a (n_dates, n_columns) float array and `date_ns` the matching dates as int64
+    nanoseconds. Returns the `dtime` and `dtime_rw` arrays with the same shape as `cum_values`
+    '''
+    n_rows, n_cols = cum_values.shape
+    rows = np.arange(n_rows)
+    cols = np.arange(n_cols)
+    nonzero = cum_values != 0
+    if not nonzero.any(axis=0).all():
+        raise IndexError('every column needs at least one nonzero value to find the start date')
+    start_idx = nonzero.argmax(axis=0) # first nonzero value in each column
+    min_idx_rw = start_idx + median_incub_prd
+    log2 = np.log(2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # doubling time since the first case
+        t_delta = (date_ns[:, None] - date_ns[start_idx][None, :]) // _ns_per_day
+        c_delta = cum_values / cum_values[start_idx, cols]
+        dtime = np.where(c_delta > 1, (t_delta * log2) / np.log(c_delta), 0.)
+
+        # rolling window doubling time. negative positions wrap around the same way `iloc` does
+        idx_rw = (rows - 6) % n_rows
+        t_delta_rw = (date_ns - date_ns[idx_rw]) // _ns_per_day
+        c_delta_rw = cum_values / cum_values[idx_rw]
+        in_window = rows[:, None] >= min_idx_rw[None, :]
+        dtime_rw = np.where(in_window & (c_delta_rw > 1), (t_delta_rw[:, None] * log2) / np.log(c_delta_rw), 0.)
+
+    dtime[0] = 0
+    dtime_rw[0] = 0
+    return dtime, dtime_rw
+
+def _doublingtimes_block(shm_names:tuple, shape:tuple, date_ns:np.ndarray, median_incub_prd:float,
+                         col_start:int, col_end:int):
+    '''
+    utility function run by each worker for `_doublingtimes_parallel`. Attaches to the shared input
+    and output arrays and does the columns `col_start:col_end`
+    '''
+    blocks = [shared_memory.SharedMemory(name=name) for name in shm_names]
+    try:
+        cum_values, dtime, dtime_rw = [np.ndarray(shape, dtype=float, buffer=block.buf, order='F') for block in blocks]
+        dtime[:, col_start:col_end], dtime_rw[:, col_start:col_end] = _doublingtimes_array(
+            cum_values[:, col_start:col_end], date_ns, median_incub_prd)
+        del cum_values, dtime, dtime_rw
+    finally:
+        for block in blocks:
+            block.close()
+
+def _doublingtimes_parallel(cum_values:np.ndarray, date_ns:np.ndarray, median_incub_prd:float, n_jobs:int):
+    '''
+    utility function that splits the columns of `cum_values` between `n_jobs` processes. The input and
+    output arrays are in shared memory (column major so each worker's columns are contiguous) so only
+    the dates and the array names get sent to the workers
+    '''
+    n_rows, n_cols = cum_values.shape
+    n_jobs = min(n_jobs, n_cols)
+    nbytes = max(cum_values.size * 8, 1)
+    blocks = [shared_memory.SharedMemory(create=True, size=nbytes) for _ in range(3)]
+    try:
+        shared_values, dtime, dtime_rw = [np.ndarray(cum_values.shape, dtype=float, buffer=block.buf, order='F')
+                                          for block in blocks]
+        shared_values[:] = cum_values
+        bounds = np.linspace(0, n_cols, n_jobs + 1).astype(int)
+        shm_names = tuple(block.name for block in blocks)
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures = [pool.submit(_doublingtimes_block, shm_names, cum_values.shape, date_ns, median_incub_prd,
+                                   col_start, col_end)
+                       for col_start, col_end in zip(bounds[:-1], bounds[1:]) if col_end > col_start]
+            for future in futures:
+                future.result()
+        results = dtime.copy(), dtime_rw.copy()
+        del shared_values, dtime, dtime_rw
+        return results
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+# Cell
+_doublingtime_cache = None # the shared cache, see `enable_doublingtime_cache`
+
 def calculate_doublingtimes(df:pd.DataFrame, col_suffix:str='cumCases',
-                            median_incubation_period:float=5.2, combine_df=True):
+                            median_incubation_period:float=5.2, combine_df=True,
+                            vectorized:bool=True, metrics=None, group_col:str=None,
+                            n_jobs:int=None, cache=None):
     '''
     given a dataframe look through and calculate the doubling times. Both doubling time based
     on the first occurance of covid-19 and doubling time based on a rolling window which
@@ -24,15 +120,67 @@ def calculate_doublingtimes(df:pd.DataFrame, col_suffix:str='cumCases',
         combine_df:bool
             if True will return a new dataframe with the doubling time data joined with the old dataframe
             if False will only return a dataframe with the doubling time data
+        vectorized:bool
+            if True will calculate all the columns at once using numpy arrays. If False will
+            step through each column and row one at a time (the original, much slower, method)
+        metrics:metricsRecorder
+            if set records the time, rows and bytes of the calculation as the `doublingtimes` stage
+        group_col:str
+            for long data (see `wide_to_long`) the column with the region names. The doubling times
+            are calculated separately for each region and the columns containing `col_suffix` hold the values
+        n_jobs:int
+            if more than 1 the columns are split between this many processes, -1 uses every cpu.
+            Only used for wide data with `vectorized=True`. Worth it for thousands of columns
+        cache:doublingtimeCache
+            reuse the result of an earlier call with the same data and parameters. Defaults to the
+            cache turned on with `enable_doublingtime_cache` (if any), False never uses a cache
 
     ------
     Return:
 
         regionDF_doublingtime: DataFrame
     '''
+    if metrics is not None:
+        with metrics.stage('doublingtimes', vectorized=vectorized) as record:
+            df_dt = calculate_doublingtimes(df, col_suffix, median_incubation_period, combine_df, vectorized,
+                                            group_col=group_col, n_jobs=n_jobs, cache=cache)
+            record['rows'] = len(df_dt)
+            record['bytes_in'] = int(df.filter(like=col_suffix).memory_usage(index=False).sum())
+            record['bytes_out'] = int(df_dt.memory_usage(index=False).sum())
+        return df_dt
+
+    cache = _doublingtime_cache if cache is None else cache
+    if cache is not False and cache is not None:
+        key = cache.key(df, col_suffix=col_suffix, median_incubation_period=median_incubation_period,
+                        combine_df=combine_df, vectorized=vectorized, group_col=group_col)
+        df_dt = cache.get(key)
+        if df_dt is None:
+            df_dt = calculate_doublingtimes(df, col_suffix, median_incubation_period, combine_df, vectorized,
+                                            group_col=group_col, n_jobs=n_jobs, cache=False)
+            cache.put(key, df_dt)
+        return df_dt.copy()
+
     median_incub_prd = np.ceil(median_incubation_period)
+    if group_col is not None:
+        return _doublingtimes_long(df, col_suffix, median_incub_prd, combine_df, group_col)
     filtered_df = df.filter(like=col_suffix)
     doubling_time = dict()
+    if vectorized:
+        date_ns = pd.DatetimeIndex(filtered_df.index).asi8
+        if n_jobs == -1:
+            n_jobs = os.cpu_count()
+        if n_jobs is not None and n_jobs > 1 and filtered_df.shape[1] > 1:
+            dtime, dtime_rw = _doublingtimes_parallel(filtered_df.to_numpy(dtype=float), date_ns, median_incub_prd, n_jobs)
+        else:
+            dtime, dtime_rw = _doublingtimes_array(filtered_df.to_numpy(dtype=float), date_ns, median_incub_prd)
+        for col_idx, label in enumerate(filtered_df.columns):
+            doubling_time[label.replace(col_suffix, 'dtime')] = dtime[:, col_idx]
+            doubling_time[label.replace(col_suffix, 'dtime_rw')] = dtime_rw[:, col_idx]
+        df_dt = pd.DataFrame(doubling_time, index=filtered_df.index)
+        if combine_df:
+            return df.join(df_dt)
+        return df_dt
+
     for label, cum_data in filtered_df.iteritems():
         start_idx = cum_data.to_numpy().nonzero()[0][0] # assumes date is used as df index
         min_idx_rw = start_idx + median_incub_prd
@@ -75,4 +223,643 @@ def calculate_doublingtimes(df:pd.DataFrame, col_suffix:str='cumCases',
     df_dt = pd.DataFrame(doubling_time, index=filtered_df.index)
     if combine_df:
         return df.join(df_dt)
-    return df_dt
\ No newline at end of file
+    return df_dt
+
+# Cell
+def _frame_fingerprint(df:pd.DataFrame):
+    '''
+    utility function that returns a cheap fingerprint of a dataframe: the shape, columns, dtypes,
+    first and last index values and a hash of the index and column buffers
+    '''
+    def update(array:np.ndarray):
+        if array.dtype.kind in 'biufcmM':
+            digest.update(np.ravel(array, order='K').view(np.uint8))
+        else:
+            digest.update(pd.util.hash_pandas_object(pd.Series(array), index=False).to_numpy().view(np.uint8))
+
+    digest = hashlib.sha256()
+    update(np.asarray(df.index))
+    if df.dtypes.nunique() == 1 and df.dtypes.iloc[0].kind in 'biufcmM':
+        update(df.to_numpy()) # a view of the data (no copy) when every column has the same dtype
+    else:
+        for col_idx in range(df.shape[1]):
+            update(df.iloc[:, col_idx].to_numpy())
+    bounds = (str(df.index[0]), str(df.index[-1])) if len(df) else (None, None)
+    return (df.shape, tuple(map(str, df.columns)), tuple(map(str, df.dtypes)), bounds, digest.hexdigest())
+
+class doublingtimeCache():
+    def __init__(self, max_bytes:int=64 * 2**20):
+        '''
+        in memory least recently used cache of `calculate_doublingtimes` results
+
+        Parameters:
+
+            max_bytes:int
+                when the saved results are bigger than this the least recently used ones get removed.
+                A result bigger than `max_bytes` is never saved
+        '''
+        self.max_bytes = max_bytes
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, df:pd.DataFrame, **params):
+        '''
+        the cache key for `df` and the keyword parameters of a call
+        '''
+        return (_frame_fingerprint(df), tuple(sorted(params.items())))
+
+    def get(self, key):
+        '''
+        return the saved result for `key` (and mark it as just used) or None if it isn't saved
+        '''
+        with self._lock:
+            if key not in self._results:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._results.move_to_end(key)
+            return self._results[key][0]
+
+    def put(self, key, df_dt:pd.DataFrame):
+        '''
+        save a result and remove the least recently used results until the cache fits in `max_bytes`
+        '''
+        nbytes = int(df_dt.memory_usage(index=True, deep=True).sum())
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._results:
+                self.size_bytes -= self._results.pop(key)[1]
+            self._results[key] = (df_dt, nbytes)
+            self.size_bytes += nbytes
+            while self.size_bytes > self.max_bytes:
+                _, (_, old_nbytes) = self._results.popitem(last=False)
+                self.size_bytes -= old_nbytes
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self.size_bytes = 0
+
+    def __len__(self):
+        return len(self._results)
+
+    def stats(self):
+        '''
+        the hits, misses, evictions, number of results and bytes used
+        '''
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'results': len(self), 'size_bytes': self.size_bytes}
+
+def enable_doublingtime_cache(max_bytes:int=64 * 2**20):
+    '''
+    turn on a shared `doublingtimeCache` used by every `calculate_doublingtimes` call and return it.
+    Calling it again replaces the cache with an empty one
+    '''
+    global _doublingtime_cache
+    _doublingtime_cache = doublingtimeCache(max_bytes)
+    return _doublingtime_cache
+
+def disable_doublingtime_cache():
+    '''
+    turn off the shared cache turned on by `enable_doublingtime_cache`
+    '''
+    global _doublingtime_cache
+    _doublingtime_cache = None
+
+# Cell
+_rolling_outputs = ('dtime', 'growth', 'R', 'avg')
+
+def _window_label(window):
+    '''
+    utility function used to name the columns for a window. `7` -> `7d`, strings are kept
+    '''
+    return f'{window}d' if isinstance(window, (int, np.integer)) else str(window)
+
+def rolling_metrics(df:pd.DataFrame, col_suffix:str='cumCases', windows=(7, 14), serial_interval:float=5.2,
+                    outputs=_rolling_outputs, combine_df:bool=True):
+    '''
+    calculate rolling window statistics of cumulative data using calendar windows
+
+    Parameters:
+
+        df:pd.DataFrame
+            cumulative data with a sorted DatetimeIndex. Missing dates are fine
+        col_suffix:str
+            only the columns containing this are used, like `calculate_doublingtimes`
+        windows:list
+            the window lengths, either a number of days or a `pd.Timedelta` string like `2W`
+        serial_interval:float
+            days between one infection and the next, used for the R approximation
+        outputs:list
+            any of `dtime` (doubling time in days), `growth` (daily growth rate of the cumulative
+            cases), `R` (new cases in the window divided by the new cases in the window before, to the
+            power of serial_interval / window) and `avg` (average new cases per day)
+        combine_df:bool
+            if True the new columns are joined to `df`
+
+    ----
+    Returns:
+
+        dataframe with a `<column>_<output>_<window>` column (`col_suffix` replaced) for each column,
+        output and window. Values that can't be calculated (not enough history, no growth) are NaN
+    '''
+    unknown = set(outputs).difference(_rolling_outputs)
+    if unknown:
+        raise ValueError(f'unknown outputs {sorted(unknown)}, choose from {_rolling_outputs}')
+    filtered_df = df.filter(like=col_suffix)
+    cum_values = filtered_df.to_numpy(dtype=float)
+    date_ns = pd.DatetimeIndex(filtered_df.index).asi8
+    rows = np.arange(len(date_ns))
+    log2 = np.log(2)
+
+    results = dict()
+    for window in windows:
+        window_ns = pd.Timedelta(days=window).value if isinstance(window, (int, float, np.number)) else pd.Timedelta(window).value
+        # the last row at least one window back, -1 if there isn't one
+        start = np.searchsorted(date_ns, date_ns - window_ns, side='right') - 1
+        valid = start >= 0
+        start_rows = np.where(valid, start, 0)
+        elapsed_days = ((date_ns - date_ns[start_rows]) / _ns_per_day)[:, None]
+        start_values = cum_values[start_rows]
+        new_cases = cum_values - start_values
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            growth = np.log(cum_values / start_values) / elapsed_days
+            growth[~valid] = np.nan
+            growth[~np.isfinite(growth)] = np.nan
+            label = _window_label(window)
+            if 'dtime' in outputs:
+                dtime = np.where(growth > 0, log2 / growth, np.nan)
+                results.update(_label_columns(filtered_df.columns, col_suffix, f'dtime_{label}', dtime))
+            if 'growth' in outputs:
+                results.update(_label_columns(filtered_df.columns, col_suffix, f'growth_{label}', growth))
+            if 'R' in outputs:
+                # the window before this one ends where this one starts
+                prev_start = np.searchsorted(date_ns, date_ns[start_rows] - window_ns, side='right') - 1
+                prev_valid = valid & (prev_start >= 0)
+                prev_cases = start_values - cum_values[np.where(prev_valid, prev_start, 0)]
+                ratio = new_cases / prev_cases
+                reproduction = ratio ** (serial_interval / (window_ns / _ns_per_day))
+                reproduction[~prev_valid[:, None] | ~np.isfinite(reproduction)] = np.nan
+                results.update(_label_columns(filtered_df.columns, col_suffix, f'R_{label}', reproduction))
+            if 'avg' in outputs:
+                average = new_cases / elapsed_days
+                average[~valid] = np.nan
+                results.update(_label_columns(filtered_df.columns, col_suffix, f'avg_{label}', average))
+
+    df_rolling = pd.DataFrame(results, index=filtered_df.index)
+    if combine_df:
+        return df.join(df_rolling)
+    return df_rolling
+
+def _label_columns(columns, col_suffix:str, name:str, values:np.ndarray):
+    '''
+    utility function that pairs up the output column names with the columns of `values`
+    '''
+    return {column.replace(col_suffix, name): values[:, col_idx] for col_idx, column in enumerate(columns)}
+
+# Cell
+def calculate_cumulatives(df:pd.DataFrame, filter_suffix:str='newCases', col_suffix:str='cumCases', combine_df:bool=True):
+    '''
+    take the dataframe and calculate the cumulative cases. Will only select columns with
+    the base key in the column name. returns a new dataframe
+
+    Parameters:
+        df:pd.DataFrame
+            the dataframe contaning the new cases data
+        filter_suffix:str
+            the string to use for filtering the dataframe using pd.DataFrame.filter(like=like_filter)
+        col_suffix:str
+            will use like_filter and old column names to determine the new cumulative column name
+            for example would find Cal_newCases and determine new column should be Cal_cumCases
+        combine_df:bool
+            if True will return a new dataframe with the cumulative data joined with the old dataframe
+            if False will only return a dataframe with the cumulative data
+
+    Returns:
+        cum_df:pd.DataFrame
+            new dataframe
+    '''
+    filtered_df = df.filter(like=filter_suffix)
+    new_cols = [col.replace(filter_suffix, col_suffix) for col in filtered_df.columns]
+    cum_df = filtered_df.cumsum().set_axis(new_cols, axis=1) # cumsum skips NaN and keeps each column's dtype
+    if combine_df:
+        return df.join(cum_df)
+    return cum_df
+
+derived_specs = {
+    'new_cases': {'op': 'diff', 'column': 'totals:cum_cases'},
+    'new_cases_avg7': {'op': 'mean', 'column': 'totals:Daily_count', 'window': 7},
+    'active_change': {'op': 'diff', 'column': 'totals:Active_cum'},
+    'cum_tests': {'op': 'cumsum', 'column': 'testing:test_count'},
+    'tests_avg7': {'op': 'mean', 'column': 'testing:test_count', 'window': 7},
+    'positivity': {'op': 'ratio', 'column': 'totals:Daily_count', 'denominator': 'testing:test_count'},
+    'positivity_7d': {'op': 'ratio', 'column': 'totals:Daily_count', 'denominator': 'testing:test_count', 'window': 7},
+    '*_new_cases': {'op': 'diff', 'column': 'regions:*_cumulative'},
+    '*_new_cases_avg7': {'op': 'mean', 'column': 'regions:*_cumulative', 'window': 7, 'diff': True},
+}
+
+_derived_ops = ('cumsum', 'diff', 'mean', 'ratio')
+
+def _match_columns(columns, pattern:str):
+    '''
+    utility function that returns the (column, wildcard match) pairs of `columns` matching `pattern`
+    '''
+    if '*' not in pattern:
+        return [(pattern, '')] if pattern in columns else []
+    prefix, suffix = pattern.split('*', 1)
+    return [(column, column[len(prefix):len(column) - len(suffix)]) for column in columns
+            if column.startswith(prefix) and column.endswith(suffix) and len(column) >= len(prefix) + len(suffix)]
+
+def _window_sums(values:np.ndarray, date_ns:np.ndarray, window:float):
+    '''
+    utility function that returns the sum of each column over the last `window` days (including the
+    current date) using a cumulative sum and `searchsorted`. Dates without a full window are NaN
+    '''
+    window_ns = int(window * _ns_per_day)
+    sums = np.vstack([np.zeros((1, values.shape[1])), np.nancumsum(values, axis=0)])
+    start = np.searchsorted(date_ns, date_ns - window_ns, side='right')
+    window_sums = sums[1:] - sums[start]
+    window_sums[date_ns - window_ns + _ns_per_day < date_ns[0]] = np.nan
+    return window_sums
+
+def derived_metrics(totals:pd.DataFrame=None, regions:pd.DataFrame=None, testing:pd.DataFrame=None,
+                    specs:dict=None):
+    '''
+    calculate a set of derived metrics from the scraped data in one pass
+
+    Parameters:
+
+        totals, regions, testing:pd.DataFrame
+            the data from `scrape_albertaTotals`, `scrape_albertaRegions` and `scrape_albertaTesting`.
+            Any of them can be left out if the specs don't use it
+        specs:dict
+            output column name: spec. Defaults to `derived_specs`. A `*` in the name is replaced by
+            the part of the column matched by the `*` in `column`. `diff: True` takes the change from the
+            previous date before a `mean`, to average cumulative data
+
+    ----
+    Returns:
+
+        dataframe with a column for each metric and the dates of all the data sets
+    '''
+    specs = derived_specs if specs is None else specs
+    sources = {name: data for name, data in (('totals', totals), ('regions', regions), ('testing', testing))
+               if data is not None}
+    index = pd.DatetimeIndex(sorted(set().union(*(data.index for data in sources.values()))))
+    arrays = dict()
+
+    def source_array(reference:str):
+        source, pattern = reference.split(':', 1)
+        if source not in sources:
+            raise ValueError(f'`{reference}` needs the {source} data')
+        if source not in arrays:
+            data = sources[source]
+            arrays[source] = (data.to_numpy(dtype=float), pd.DatetimeIndex(data.index).asi8,
+                              index.get_indexer(data.index), {column: idx for idx, column in enumerate(data.columns)})
+        values, date_ns, out_rows, positions = arrays[source]
+        matches = _match_columns(positions, pattern)
+        return values[:, [positions[column] for column, _ in matches]], date_ns, out_rows, [match for _, match in matches]
+
+    # work out the output columns first so the output can be allocated once
+    plan = list()
+    names = list()
+    for name, spec in specs.items():
+        if spec['op'] not in _derived_ops:
+            raise ValueError(f"unknown op `{spec['op']}` for `{name}`, choose from {_derived_ops}")
+        values, date_ns, out_rows, matches = source_array(spec['column'])
+        plan.append((len(names), spec, values, date_ns, out_rows))
+        names += [name.replace('*', match) for match in matches]
+
+    output = np.full((len(index), len(names)), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for first_col, spec, values, date_ns, out_rows in plan:
+            cols = slice(first_col, first_col + values.shape[1])
+            if spec.get('diff'):
+                values = np.diff(values, axis=0, prepend=np.nan)
+            if spec['op'] == 'cumsum':
+                output[out_rows, cols] = np.nancumsum(values, axis=0)
+            elif spec['op'] == 'diff':
+                output[out_rows, cols] = np.diff(values, axis=0, prepend=np.nan)
+            elif spec['op'] == 'mean':
+                output[out_rows, cols] = _window_sums(values, date_ns, spec['window']) / spec['window']
+            else:
+                denominator, denom_dates, denom_rows, _ = source_array(spec['denominator'])
+                if 'window' in spec:
+                    values = _window_sums(values, date_ns, spec['window'])
+                    denominator = _window_sums(denominator, denom_dates, spec['window'])
+                numerator = np.full((len(index), values.shape[1]), np.nan)
+                numerator[out_rows] = values
+                aligned_denominator = np.full((len(index), 1), np.nan)
+                aligned_denominator[denom_rows] = denominator[:, :1]
+                ratio = numerator / aligned_denominator
+                ratio[~np.isfinite(ratio)] = np.nan
+                output[:, cols] = ratio
+
+    return pd.DataFrame(output, index=index, columns=names)
+
+# Cell
+def downcast_integers(df:pd.DataFrame):
+    '''
+    return a copy of `df` with each integer column stored in the smallest integer type that fits its values
+    '''
+    df = df.copy()
+    for column in df.select_dtypes('integer'):
+        df[column] = pd.to_numeric(df[column], downcast='integer')
+    return df
+
+def wide_to_long(df:pd.DataFrame, col_suffix:str='_cumulative', value_name:str='cumulative',
+                 group_col:str='region'):
+    '''
+    convert wide data (one column per region) to long data with one row per region and date
+
+    Parameters:
+
+        df:pd.DataFrame
+            the wide data with the dates as the index
+        col_suffix:str
+            only the columns ending with this are used. It is removed to get the region names
+        value_name:str
+            the name of the value column
+        group_col:str
+            the name of the categorical region column
+
+    ----
+    Returns:
+
+        long_df:pd.DataFrame
+            the dates are the index, sorted by region and then date
+    '''
+    wide = df[[column for column in df.columns if column.endswith(col_suffix)]]
+    regions = [column[:len(column) - len(col_suffix)] if col_suffix else column for column in wide.columns]
+    n_dates = len(wide)
+    codes = np.repeat(np.arange(len(regions), dtype=np.int16 if len(regions) < 2**15 else np.int32), n_dates)
+    long_df = pd.DataFrame({group_col: pd.Categorical.from_codes(codes, categories=regions),
+                            value_name: wide.to_numpy().T.ravel()},
+                           index=pd.DatetimeIndex(np.tile(wide.index.to_numpy(), len(regions)), name=wide.index.name))
+    return downcast_integers(long_df)
+
+def _doublingtimes_long(df:pd.DataFrame, col_suffix:str, median_incub_prd:float, combine_df:bool, group_col:str):
+    '''
+    utility function that calculates the doubling times for long data. The rows are sorted by region
+    and date once and each region is a slice that goes through `_doublingtimes_array`
+    '''
+    filtered_df = df.filter(like=col_suffix)
+    codes = pd.factorize(df[group_col], sort=False)[0]
+    date_ns = pd.DatetimeIndex(df.index).asi8
+    order = np.lexsort((date_ns, codes))
+    sorted_codes = codes[order]
+    sorted_dates = date_ns[order]
+    values = filtered_df.to_numpy(dtype=float)[order]
+    splits = np.flatnonzero(np.diff(sorted_codes)) + 1
+
+    dtime = np.empty_like(values)
+    dtime_rw = np.empty_like(values)
+    for start, end in zip(np.r_[0, splits], np.r_[splits, len(order)]):
+        dtime[order[start:end]], dtime_rw[order[start:end]] = _doublingtimes_array(values[start:end], sorted_dates[start:end],
+                                                                                   median_incub_prd)
+    doubling_time = dict()
+    for col_idx, label in enumerate(filtered_df.columns):
+        doubling_time[label.replace(col_suffix, 'dtime')] = dtime[:, col_idx]
+        doubling_time[label.replace(col_suffix, 'dtime_rw')] = dtime_rw[:, col_idx]
+    df_dt = pd.DataFrame(doubling_time, index=df.index)
+    if combine_df:
+        return pd.concat([df, df_dt], axis=1)
+    return df_dt
+
+# Cell
+def _file_columns(flpath:Path):
+    '''
+    utility function that returns the data columns (not the index) of a csv or parquet file
+    '''
+    if flpath.suffix == '.csv':
+        return list(pd.read_csv(flpath, index_col=0, nrows=0).columns)
+    import pyarrow.parquet as pq
+    schema = pq.ParquetDataset(flpath).schema
+    index_columns = (schema.pandas_metadata or {}).get('index_columns', [])
+    return [name for name in schema.names if name not in index_columns]
+
+def _read_column_block(flpath:Path, columns:list, positions:list):
+    '''
+    utility function that reads some of the columns of a csv or parquet file with the dates as the index
+    '''
+    if flpath.suffix == '.csv':
+        # usecols only takes positions or names, the index is the first column
+        block = pd.read_csv(flpath, index_col=0, usecols=[0] + [position + 1 for position in positions], parse_dates=True)
+        return block[columns]
+    return pd.read_parquet(flpath, columns=columns).sort_index()
+
+def calculate_doublingtimes_chunked(flpath, output_folder, col_suffix:str='cumCases',
+                                    median_incubation_period:float=5.2, block_columns:int=100,
+                                    fltype:str='parquet'):
+    '''
+    calculate the doubling times of a saved csv or parquet file (or parquet folder) a block of
+    columns at a time. Gives the same results as `calculate_doublingtimes` with `combine_df=False`
+
+    Parameters:
+
+        flpath:str
+            the csv or parquet file with the dates as the index
+        output_folder:str
+            folder the doubling times are written to, one `block-#####` file per block. Old blocks are removed
+        col_suffix:str
+            only the columns containing this are used, the same as `calculate_doublingtimes`
+        median_incubation_period:float
+            see `calculate_doublingtimes`
+        block_columns:int
+            the number of columns read and calculated at once
+        fltype:str
+            `parquet` or `csv` for the output blocks
+
+    ----
+    Returns:
+
+        block_files:list
+            the files written, in column order
+    '''
+    if fltype not in ('parquet', 'csv'):
+        raise ValueError(f'fltype must be `parquet` or `csv` not `{fltype}`')
+    flpath = Path(flpath)
+    output_folder = Path(output_folder)
+    output_folder.mkdir(parents=True, exist_ok=True)
+    for old_block in output_folder.glob('block-*'):
+        old_block.unlink()
+
+    all_columns = _file_columns(flpath)
+    positions = [position for position, column in enumerate(all_columns) if col_suffix in column]
+    block_files = list()
+    for block_idx, start in enumerate(range(0, len(positions), block_columns)):
+        block_positions = positions[start:start + block_columns]
+        block = _read_column_block(flpath, [all_columns[position] for position in block_positions], block_positions)
+        df_dt = calculate_doublingtimes(block, col_suffix=col_suffix, median_incubation_period=median_incubation_period,
+                                        combine_df=False)
+        block_file = output_folder.joinpath(f'block-{block_idx:05d}.{fltype}')
+        if fltype == 'parquet':
+            df_dt.to_parquet(block_file)
+        else:
+            # pandas formats the whole frame as text at once by default which uses more memory than the block
+            df_dt.to_csv(block_file, chunksize=max(10000 // max(len(df_dt.columns), 1), 1))
+        block_files.append(block_file)
+        del block, df_dt
+    return block_files
+
+def read_doublingtime_blocks(output_folder, columns=None):
+    '''
+    read the blocks written by `calculate_doublingtimes_chunked` back into one dataframe. If `columns`
+    is set only those columns are kept
+    '''
+    frames = list()
+    for block_file in sorted(Path(output_folder).glob('block-*')):
+        if block_file.suffix == '.csv':
+            block = pd.read_csv(block_file, index_col=0, parse_dates=True)
+        else:
+            block = pd.read_parquet(block_file)
+        if columns is not None:
+            block = block[[column for column in block.columns if column in columns]]
+        frames.append(block)
+    return pd.concat(frames, axis=1)
+
+# Cell
+class doublingtimeTracker():
+    def __init__(self, col_suffix:str='cumCases', median_incubation_period:float=5.2):
+        '''
+        keeps the state needed to calculate the doubling times one new row at a time. Uses the same
+        math as `calculate_doublingtimes` but only needs the new rows of the dataframe to update
+
+        Parameters:
+
+            col_suffix:str
+                cumulative column suffix used to filter the dataframe to only grab cumulative data
+                uses pd.DataFrame.filter(like=col_suffix)
+            median_incubation_period:float
+                used to decide when to start the rolling window calculation (converted to integer
+                using ceiling)
+        '''
+        self.col_suffix = col_suffix
+        self.median_incubation_period = median_incubation_period
+        self.n_rows = 0
+        self.last_date = None
+        self.window_dates = deque(maxlen=6)
+        self.columns = dict()
+
+    def _new_column_state(self):
+        return {'start_idx': None, 'start_cases': None, 'start_date': None, 'window': deque(maxlen=6)}
+
+    def _update_row(self, state:dict, new_cases:float, new_date:pd.Timestamp):
+        '''
+        utility function that calculates the doubling times for one new value of one column
+        and updates the column state
+        '''
+        idx = self.n_rows
+        if state['start_idx'] is None and new_cases != 0:
+            state['start_idx'], state['start_cases'], state['start_date'] = idx, new_cases, new_date
+
+        dtime, dtime_rw = 0, 0 # default
+        if idx > 0 and state['start_idx'] is not None:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                c_delta = np.float64(new_cases) / state['start_cases']
+                if c_delta > 1:
+                    dtime = ((new_date - state['start_date']).days * np.log(2))/(np.log(c_delta))
+                # Rolling window calculation. Needs a full window of older rows
+                min_idx_rw = state['start_idx'] + np.ceil(self.median_incubation_period)
+                if idx >= min_idx_rw and len(state['window']) == state['window'].maxlen:
+                    c_delta_rw = np.float64(new_cases) / state['window'][0]
+                    if c_delta_rw > 1:
+                        dtime_rw = ((new_date - self.window_dates[0]).days * np.log(2))/(np.log(c_delta_rw))
+        state['window'].append(new_cases)
+        return dtime, dtime_rw
+
+    def update(self, df:pd.DataFrame):
+        '''
+        calculate the doubling times for the rows in `df` that are newer than `self.last_date`
+        and update the state. Older rows are skipped so it is safe to pass the full history
+
+        Parameters:
+
+            df: pd.DataFrame
+                dataframe with a date index, such as the output of `albertaC19.scrape_albertaTotals`
+                or `albertaC19.scrape_albertaRegions`
+
+        ------
+        Return:
+
+            df_dt: DataFrame
+                the doubling time data for the new rows only
+        '''
+        filtered_df = df.filter(like=self.col_suffix)
+        if self.last_date is not None:
+            filtered_df = filtered_df[filtered_df.index > self.last_date]
+        if not self.columns:
+            self.columns = {label: self._new_column_state() for label in filtered_df.columns}
+        elif set(filtered_df.columns) != set(self.columns):
+            raise ValueError('the columns in the dataframe do not match the columns being tracked')
+
+        doubling_time = {key: list() for label in self.columns
+                         for key in (label.replace(self.col_suffix, 'dtime'), label.replace(self.col_suffix, 'dtime_rw'))}
+        values = filtered_df[list(self.columns)].to_numpy()
+        for new_date, row in zip(filtered_df.index, values):
+            for label, new_cases in zip(self.columns, row):
+                dtime, dtime_rw = self._update_row(self.columns[label], new_cases, new_date)
+                doubling_time[label.replace(self.col_suffix, 'dtime')].append(dtime)
+                doubling_time[label.replace(self.col_suffix, 'dtime_rw')].append(dtime_rw)
+            self.window_dates.append(new_date)
+            self.last_date = new_date
+            self.n_rows += 1
+        return pd.DataFrame(doubling_time, index=filtered_df.index)
+
+    def to_dict(self):
+        '''
+        return the tracker state as a json friendly dictionary
+        '''
+        columns = dict()
+        for label, state in self.columns.items():
+            columns[label] = {'start_idx': state['start_idx'],
+                              'start_cases': None if state['start_cases'] is None else float(state['start_cases']),
+                              'start_date': None if state['start_date'] is None else state['start_date'].isoformat(),
+                              'window': [float(cases) for cases in state['window']]}
+        return {'col_suffix': self.col_suffix,
+                'median_incubation_period': self.median_incubation_period,
+                'n_rows': self.n_rows,
+                'last_date': None if self.last_date is None else self.last_date.isoformat(),
+                'window_dates': [date.isoformat() for date in self.window_dates],
+                'columns': columns}
+
+    @classmethod
+    def from_dict(cls, state:dict):
+        '''
+        rebuild a tracker from the dictionary returned by `to_dict`
+        '''
+        tracker = cls(col_suffix=state['col_suffix'], median_incubation_period=state['median_incubation_period'])
+        tracker.n_rows = state['n_rows']
+        tracker.last_date = None if state['last_date'] is None else pd.Timestamp(state['last_date'])
+        tracker.window_dates.extend(pd.Timestamp(date) for date in state['window_dates'])
+        for label, col_state in state['columns'].items():
+            new_state = tracker._new_column_state()
+            new_state['start_idx'] = col_state['start_idx']
+            new_state['start_cases'] = col_state['start_cases']
+            if col_state['start_date'] is not None:
+                new_state['start_date'] = pd.Timestamp(col_state['start_date'])
+            new_state['window'].extend(col_state['window'])
+            tracker.columns[label] = new_state
+        return tracker
+
+    def save(self, flpath):
+        '''
+        save the tracker state to a json file
+        '''
+        with open(flpath, 'w') as fl:
+            json.dump(self.to_dict(), fl)
+
+    @classmethod
+    def load(cls, flpath):
+        '''
+        load a tracker state saved with `save`
+        '''
+        with open(flpath) as fl:
+            return cls.from_dict(json.load(fl))
\ No newline at end of file
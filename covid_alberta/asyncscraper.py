@@ -0,0 +1,177 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: 06_asyncscraper.ipynb (unless otherwise specified).
+
+__all__ = ['url_folder', 'asyncAlbertaC19']
+
+# Cell
+import re
+import time
+import asyncio
+from functools import partial
+from urllib.parse import urlsplit
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from .webscraper import albertaC19
+
+# Cell
+def _scrape_page(url:str, content:bytes, scraper_kwargs:dict, fltypes):
+    '''
+    utility function run by each worker. Scrapes one downloaded page and times it
+    '''
+    start = time.perf_counter()
+    scraper = albertaC19(covid_url=url, **scraper_kwargs)
+    scraper.set_content(content)
+    dataframes = scraper.scrape_all(fltypes=fltypes, return_dataframes=True)
+    return dataframes, time.perf_counter() - start
+
+def url_folder(url:str):
+    '''
+    the name of the output subfolder used for `url`, made from the host and path
+    '''
+    parts = urlsplit(url)
+    return re.sub(r'[^A-Za-z0-9.-]+', '_', f'{parts.netloc}{parts.path}').strip('_')
+
+class asyncAlbertaC19():
+    def __init__(self, covid_urls, outputfolder:str='data', max_connections:int=10, per_host:int=2,
+                 host_interval:float=0, timeout:float=30, executor:str='process', max_workers:int=None,
+                 scraper_kwargs:dict=None):
+        '''
+        scrape a list of alberta covid dashboards concurrently. Each page is downloaded with
+        `aiohttp` and scraped by `albertaC19` in a worker pool so the event loop never waits on the parsing
+
+        Parameters:
+
+            covid_urls:list
+                the urls of the dashboards
+            outputfolder:str
+                the data for each url is saved in a subfolder named after the url (see `url_folder`)
+            max_connections:int
+                the most downloads running at the same time
+            per_host:int
+                the most downloads running at the same time from one host
+            host_interval:float
+                the minimum seconds between the start of two requests to the same host
+            timeout:float
+                seconds to wait for a website before giving up
+            executor:str
+                `process` or `thread`. The pool the pages are scraped in
+            max_workers:int
+                number of workers in the pool. If None uses the default for the pool
+            scraper_kwargs:dict
+                extra arguments passed to `albertaC19`, like `html_update_ids`
+        '''
+        if executor not in ('process', 'thread'):
+            raise ValueError(f"executor must be `process` or `thread` not `{executor}`")
+        self.covid_urls = list(covid_urls)
+        self.outputfolder = Path(outputfolder)
+        self.outputfolder.mkdir(parents=True, exist_ok=True) # albertaC19 only makes the url subfolder
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.host_interval = host_interval
+        self.timeout = timeout
+        self.executor = executor
+        self.max_workers = max_workers
+        self.scraper_kwargs = dict(scraper_kwargs or {})
+        self.timings = dict()
+        self._host_locks = dict()
+        self._host_next_request = dict()
+
+    async def _wait_for_host(self, host:str):
+        '''
+        utility function that waits until a request to `host` is allowed by `host_interval`
+        '''
+        if not self.host_interval:
+            return
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            loop = asyncio.get_running_loop()
+            delay = self._host_next_request.get(host, 0) - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._host_next_request[host] = loop.time() + self.host_interval
+
+    async def _fetch(self, client, url:str):
+        '''
+        utility function that downloads one page
+        '''
+        await self._wait_for_host(urlsplit(url).netloc)
+        async with client.get(url) as response:
+            response.raise_for_status()
+            return await response.read()
+
+    async def _scrape_url(self, client, pool, url:str, fltypes):
+        '''
+        utility function that downloads and scrapes one url. Errors are returned instead of raised
+        so one broken website doesn't stop the others
+        '''
+        start = time.perf_counter()
+        fetch_seconds = None
+        try:
+            content = await self._fetch(client, url)
+            fetch_seconds = time.perf_counter() - start
+            scraper_kwargs = dict(self.scraper_kwargs, outputfolder=self.outputfolder.joinpath(url_folder(url)))
+            loop = asyncio.get_running_loop()
+            dataframes, scrape_seconds = await loop.run_in_executor(pool, _scrape_page, url, content,
+                                                                    scraper_kwargs, fltypes)
+        except Exception as error:
+            self.timings[url] = {'fetch': fetch_seconds, 'scrape': None, 'error': repr(error)}
+            return url, None, error
+        self.timings[url] = {'fetch': fetch_seconds, 'scrape': scrape_seconds, 'error': None}
+        return url, dataframes, None
+
+    async def scrape(self, fltypes=None):
+        '''scrape all of the urls. This is an async generator that yields the results as each
+        url finishes
+
+        Parameters:
+
+            fltypes:[list or str]
+                the filetypes to write, see `albertaC19._write_dataframe`. Use `None` to not write anything
+        ----
+        Returns:
+
+            url, (totals, regions, testing), error
+                the dataframes are None and error is the exception if the url failed
+        '''
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.per_host)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        pool_class = ProcessPoolExecutor if self.executor == 'process' else ThreadPoolExecutor
+        pool = pool_class(max_workers=self.max_workers)
+        try:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as client:
+                tasks = [asyncio.ensure_future(self._scrape_url(client, pool, url, fltypes))
+                         for url in self.covid_urls]
+                try:
+                    for task in asyncio.as_completed(tasks):
+                        yield await task
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            # waiting for the running scrapes happens in another thread so the event loop isn't blocked
+            await asyncio.get_running_loop().run_in_executor(None, partial(pool.shutdown, cancel_futures=True))
+
+    async def scrape_all(self, fltypes=None):
+        '''
+        scrape all of the urls and wait for them to finish. Returns a dictionary of
+        url: (totals, regions, testing). Failed urls are left out, see `self.timings` for the errors
+        '''
+        results = dict()
+        async for url, dataframes, error in self.scrape(fltypes):
+            if error is None:
+                results[url] = dataframes
+        return results
+
+    def run(self, fltypes=None):
+        '''
+        run `scrape_all` from normal (not async) code. If an event loop is already running
+        (like in jupyter) it is run in a separate thread
+        '''
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.scrape_all(fltypes))
+        with ThreadPoolExecutor(max_workers=1) as runner:
+            return runner.submit(asyncio.run, self.scrape_all(fltypes)).result()
\ No newline at end of file
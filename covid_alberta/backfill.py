@@ -0,0 +1,147 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: 04_backfill.ipynb (unless otherwise specified).
+
+__all__ = ['find_html_files', 'file_vintage', 'merge_vintages', 'backfill']
+
+# Cell
+import re
+import glob
+import time
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from .webscraper import albertaC19
+
+# Cell
+def find_html_files(html_files):
+    '''
+    return a sorted list of html files from a folder, a glob pattern or a list of files
+    '''
+    if isinstance(html_files, (str, Path)):
+        if Path(html_files).is_dir():
+            return sorted(Path(html_files).glob('*.html'))
+        return sorted(Path(flpath) for flpath in glob.glob(str(html_files)))
+    return [Path(flpath) for flpath in html_files]
+
+def file_vintage(flpath):
+    '''
+    the date a saved page is from. Uses a `YYYY-MM-DD` date in the filename if there is one
+    otherwise uses the time the file was last modified
+    '''
+    flpath = Path(flpath)
+    date_match = re.search(r'\d{4}-\d{2}-\d{2}', flpath.name)
+    if date_match:
+        return pd.Timestamp(date_match.group(0))
+    return pd.Timestamp(flpath.stat().st_mtime, unit='s').floor('s')
+
+def _scrape_file(flpath:Path, scraper_kwargs:dict):
+    '''
+    utility function run by each worker. Scrapes one saved page and times it
+    '''
+    start = time.perf_counter()
+    scraper = albertaC19.from_file(flpath, **scraper_kwargs)
+    dataframes = scraper.scrape_all(fltypes=None, return_dataframes=True)
+    return dataframes, time.perf_counter() - start
+
+def merge_vintages(vintage_dataframes):
+    '''
+    merge a list of (vintage, dataframe) pairs into one dataframe. For each date and column the
+    value from the newest vintage is used. When two dataframes have the same vintage the one later
+    in the list wins, so the result only depends on the order of the list
+
+    ----
+    Returns:
+
+        merged:pd.DataFrame
+            the merged data with the dates as the index
+        vintages:pd.DataFrame
+            same shape as `merged` with the vintage each value came from
+    '''
+    long_frames = list()
+    columns = list()
+    for vintage, dataframe in vintage_dataframes:
+        long_df = dataframe.rename_axis(index='date', columns='field').stack().rename('value').reset_index()
+        long_df['vintage'] = vintage
+        long_frames.append(long_df)
+        columns.extend(column for column in dataframe.columns if column not in columns)
+    long_df = pd.concat(long_frames, ignore_index=True).sort_values('vintage', kind='mergesort')
+    long_df = long_df.drop_duplicates(['date', 'field'], keep='last')
+
+    merged = long_df.pivot(index='date', columns='field', values='value').reindex(columns=columns)
+    vintages = long_df.pivot(index='date', columns='field', values='vintage').reindex(columns=columns)
+    for column in merged.columns:
+        if merged[column].notna().all() and (merged[column] % 1 == 0).all():
+            merged[column] = merged[column].astype(np.int64)
+    merged = merged.rename_axis(index=None, columns=None)
+    vintages = vintages.rename_axis(index=None, columns=None)
+    return merged, vintages
+
+def backfill(html_files, outputfolder:str='data', fltypes=('csv', 'json'), max_workers:int=None,
+             totalfl:str='alberta_total_data', regionsfl:str='alberta_region_data',
+             testfl:str='alberta_testing_data', scraper_kwargs:dict=None):
+    '''
+    scrape a set of saved alberta covid pages in parallel and merge the results into one
+    history for the totals, regions and testing data. Each merged dataframe is written to the
+    output folder along with a `_vintage` file recording which page each value came from
+
+    Parameters:
+
+        html_files:[str, Path or list]
+            a folder of html files, a glob pattern (like `archive/*.html`) or a list of files
+        outputfolder:str
+            the folder to save the merged data to
+        fltypes:[list or str]
+            the filetypes to write, see `albertaC19._write_dataframe`. Use `None` to not write anything
+        max_workers:int
+            number of processes to use. If None uses the number of cpus
+        totalfl, regionsfl, testfl:str
+            filenames without the file ending for the merged data
+        scraper_kwargs:dict
+            extra arguments passed to `albertaC19.from_file`, like `html_update_ids`
+
+    ----
+    Returns:
+
+        merged:dict
+            the merged dataframe for `totals`, `regions` and `testing`
+        vintages:dict
+            the vintage of each value for `totals`, `regions` and `testing`
+        timings:pd.DataFrame
+            the vintage, seconds taken and any error for each file
+    '''
+    scraper_kwargs = dict(scraper_kwargs or {}, outputfolder=outputfolder)
+    html_files = find_html_files(html_files)
+    series_names = ('totals', 'regions', 'testing')
+    file_dataframes = dict()
+    timings = list()
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(_scrape_file, flpath, scraper_kwargs): flpath for flpath in html_files}
+        for future in as_completed(futures):
+            flpath = futures[future]
+            vintage = file_vintage(flpath)
+            try:
+                dataframes, seconds = future.result()
+            except Exception as error:
+                timings.append({'file': str(flpath), 'vintage': vintage, 'seconds': np.nan, 'error': repr(error)})
+                continue
+            timings.append({'file': str(flpath), 'vintage': vintage, 'seconds': seconds, 'error': None})
+            file_dataframes[flpath] = (vintage, dataframes)
+
+    # the files finish in any order, so they are merged in the order of `html_files`. Pages with the
+    # same vintage (two saves on one day) are then always decided by the file that sorts last
+    vintage_dataframes = {name: list() for name in series_names}
+    for flpath in html_files:
+        if flpath not in file_dataframes: continue
+        vintage, dataframes = file_dataframes[flpath]
+        for name, dataframe in zip(series_names, dataframes):
+            vintage_dataframes[name].append((vintage, dataframe))
+
+    timings = pd.DataFrame(timings, columns=['file', 'vintage', 'seconds', 'error']).sort_values('file', ignore_index=True)
+    merged, vintages = dict(), dict()
+    writer = albertaC19(outputfolder=outputfolder)
+    for name, filename in zip(series_names, (totalfl, regionsfl, testfl)):
+        if not vintage_dataframes[name]: continue
+        merged[name], vintages[name] = merge_vintages(vintage_dataframes[name])
+        writer._write_dataframe(merged[name], filename, fltypes)
+        writer._write_dataframe(vintages[name], f'{filename}_vintage', fltypes)
+    return merged, vintages, timings
\ No newline at end of file
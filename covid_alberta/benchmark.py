@@ -0,0 +1,185 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: 05_benchmark.ipynb (unless otherwise specified).
+
+__all__ = ['measure', 'synthetic_cumulative', 'synthetic_page', 'run_benchmarks', 'compare_benchmarks',
+           'doublingtimes_scaling']
+
+# Cell
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import tracemalloc
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from bs4 import BeautifulSoup
+from .webscraper import albertaC19, extract_section_scripts
+from .analysis import calculate_doublingtimes
+
+# Cell
+def measure(func, repeat:int=3, memory:bool=True):
+    '''
+    run `func` `repeat` times and return the best and mean wall time in seconds and the peak
+    python memory (from `tracemalloc`) in MB. `tracemalloc` slows everything down so the memory
+    comes from an extra run that isn't timed. With `memory=False` that run is skipped and `peak_mb` is None
+    '''
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        func()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    times = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {'best_s': min(times), 'mean_s': float(np.mean(times)), 'peak_mb': peak_mb}
+
+def synthetic_cumulative(n_days:int=365, n_columns:int=100, col_suffix:str='cumCases', seed:int=0):
+    '''
+    random cumulative case counts with `n_days` rows and `n_columns` columns. The columns start
+    on different days like the real regions do
+    '''
+    rng = np.random.default_rng(seed)
+    values = rng.poisson(5, size=(n_days, n_columns)).cumsum(axis=0)
+    starts = rng.integers(0, max(n_days // 10, 1), size=n_columns)
+    values[np.arange(n_days)[:, None] < starts[None, :]] = 0
+    return pd.DataFrame(values, index=pd.date_range('2020-03-01', periods=n_days),
+                        columns=[f'region{idx}_{col_suffix}' for idx in range(n_columns)])
+
+def _widget_script(traces:list):
+    payload = {'x': {'data': [{'x': list(dates), 'y': [int(value) for value in values], 'name': name, 'type': 'scatter'}
+                              for name, dates, values in traces]}, 'evals': [], 'jsHooks': []}
+    return f'<script type="application/json" data-for="htmlwidget">{json.dumps(payload)}</script>\n'
+
+def synthetic_page(n_days:int=365, n_zones:int=5, seed:int=0):
+    '''
+    a page in the same layout as the alberta covid website with `n_days` of data and `n_zones`
+    regions that can be used with `albertaC19.set_content`
+    '''
+    cum_data = synthetic_cumulative(n_days, n_zones + 5, seed=seed)
+    dates = cum_data.index.strftime('%Y-%m-%d')
+    cum_cases = cum_data.iloc[:, :n_zones].sum(axis=1)
+    status = [('Cases', dates, cum_cases)] + [(name, dates, cum_data.iloc[:, n_zones + idx]) for idx, name
+                                              in enumerate(['Active', 'Died', 'Recovered'])]
+    daily = [(name, dates, cum_data.iloc[:, n_zones + 3 + idx].diff().fillna(0)) for idx, name in enumerate(['Confirmed', 'Probable'])]
+    zones = [(f'Area{idx} Zone', dates, cum_data.iloc[:, idx]) for idx in range(n_zones)]
+    sections = {'cases': _widget_script(status) + _widget_script([('Other', ['a'], [1])]) + _widget_script(daily),
+                'geospatial': _widget_script(zones),
+                'laboratory-testing': _widget_script([('Tests', dates, cum_data.iloc[:, -1])])}
+    body = ''.join(f'<div id="{section_id}" class="section level2">\n{scripts}</div>\n' for section_id, scripts in sections.items())
+    return f'<!DOCTYPE html>\n<html><head><meta charset="utf-8" /></head><body>\n{body}</body></html>\n'.encode()
+
+# Cell
+def _bench_page(name:str, content:bytes, repeat:int):
+    results = dict()
+    results[f'parse_soup[{name}]'] = measure(lambda: BeautifulSoup(content, 'html.parser'), repeat)
+    results[f'parse_stream[{name}]'] = measure(lambda: extract_section_scripts(content, ['cases', 'geospatial', 'laboratory-testing']), repeat)
+    scraper = albertaC19(outputfolder=tempfile.gettempdir())
+    scraper.set_content(content)
+    def scrape_all():
+        scraper.widgets = None
+        scraper.scrape_all(fltypes=None)
+    results[f'scrape_all[{name}]'] = measure(scrape_all, repeat)
+    widgets = scraper.index_widgets()['cases']
+    order = scraper.totals_figure_order
+    results[f'clean_daily_case_data[{name}]'] = measure(lambda: scraper._clean_daily_case_data(widgets[order['daily_cases']]), repeat)
+    results[f'clean_case_status_data[{name}]'] = measure(lambda: scraper._clean_case_status_data(widgets[order['case_status']]), repeat)
+    return results
+
+def _bench_write(name:str, dataframe:pd.DataFrame, fltypes, repeat:int):
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        writer = albertaC19(outputfolder=tmpdir)
+        for fltype in fltypes:
+            results[f'write_{fltype}[{name}]'] = measure(lambda: writer._write_dataframe(dataframe, name, fltype), repeat)
+    return results
+
+def _bench_doublingtimes(name:str, dataframe:pd.DataFrame, col_suffix:str, repeat:int, loop:bool):
+    results = {f'doublingtimes[{name}]': measure(lambda: calculate_doublingtimes(dataframe, col_suffix=col_suffix), repeat)}
+    if loop:
+        results[f'doublingtimes_loop[{name}]'] = measure(lambda: calculate_doublingtimes(dataframe, col_suffix=col_suffix,
+                                                                                       vectorized=False), 1)
+    return results
+
+def run_benchmarks(pages=('testing/alberta_dashboard_sample.html',), data_folder='data', n_days:int=10000,
+                   n_columns:int=1000, repeat:int=3, fltypes=('csv', 'json', 'parquet', 'feather'), output=None):
+    '''
+    run all the benchmarks and return the results as a dictionary. Each benchmark records the best
+    and mean time in seconds and the peak python memory in MB
+
+    Parameters:
+
+        pages:list
+            saved copies of the website used for the parsing, scraping and cleaning benchmarks
+        data_folder:str
+            folder with the saved `alberta_total_data.csv` and `alberta_region_data.csv`
+        n_days, n_columns:int
+            size of the synthetic data. The synthetic page gets `n_days` of data and `n_columns // 10`
+            regions. The synthetic doubling time data gets `n_columns` columns
+        repeat:int
+            how many times to run each benchmark
+        fltypes:list
+            the filetypes to benchmark writing. parquet and feather are skipped if pyarrow isn't installed
+        output:str
+            if set will save the results to this json file
+    '''
+    try:
+        import pyarrow
+    except ImportError:
+        fltypes = [fltype for fltype in fltypes if fltype not in ('parquet', 'feather')]
+
+    results = dict()
+    for page in pages:
+        results.update(_bench_page(Path(page).name, Path(page).read_bytes(), repeat))
+    results.update(_bench_page(f'synthetic_{n_days}d', synthetic_page(n_days, max(n_columns // 10, 1)), repeat))
+
+    data_folder = Path(data_folder)
+    totals = pd.read_csv(data_folder.joinpath('alberta_total_data.csv'), index_col=0, parse_dates=True)
+    regions = pd.read_csv(data_folder.joinpath('alberta_region_data.csv'), index_col=0, parse_dates=True)
+    synthetic = synthetic_cumulative(n_days, n_columns)
+    results.update(_bench_write('alberta_total_data', totals, fltypes, repeat))
+    results.update(_bench_write(f'synthetic_{n_days}x{n_columns}', synthetic, fltypes, repeat))
+    results.update(_bench_doublingtimes('alberta_total_data', totals, 'cum_cases', repeat, loop=True))
+    results.update(_bench_doublingtimes('alberta_region_data', regions, 'cumulative', repeat, loop=True))
+    results.update(_bench_doublingtimes(f'synthetic_{n_days}x{n_columns}', synthetic, 'cumCases', repeat, loop=False))
+
+    benchmarks = {'info': {'timestamp': pd.Timestamp.utcnow().isoformat(), 'python': sys.version.split()[0],
+                           'pandas': pd.__version__, 'numpy': np.__version__, 'platform': platform.platform(),
+                           'n_days': n_days, 'n_columns': n_columns, 'repeat': repeat},
+                  'results': results}
+    if output:
+        Path(output).write_text(json.dumps(benchmarks, indent=1))
+    return benchmarks
+
+def compare_benchmarks(old, new):
+    '''
+    compare two benchmark results (dictionaries or saved json files). Returns a dataframe with
+    the best time and peak memory of each run and the new/old ratios
+    '''
+    old, new = [json.loads(Path(run).read_text()) if isinstance(run, (str, Path)) else run for run in (old, new)]
+    comparison = pd.DataFrame({'old_s': {name: result['best_s'] for name, result in old['results'].items()},
+                               'new_s': {name: result['best_s'] for name, result in new['results'].items()},
+                               'old_mb': {name: result['peak_mb'] for name, result in old['results'].items()},
+                               'new_mb': {name: result['peak_mb'] for name, result in new['results'].items()}})
+    comparison['time_ratio'] = comparison['new_s'] / comparison['old_s']
+    comparison['memory_ratio'] = comparison['new_mb'] / comparison['old_mb']
+    return comparison
+
+# Cell
+def doublingtimes_scaling(n_days:int=10000, n_columns:int=1000, jobs=None, repeat:int=3):
+    '''
+    time `calculate_doublingtimes` on `n_days` x `n_columns` of synthetic data for each number of
+    processes in `jobs` (defaults to 1 up to the number of cpus). Returns a dataframe with the
+    best time and the speedup over one process
+    '''
+    dataframe = synthetic_cumulative(n_days, n_columns)
+    jobs = jobs or range(1, (os.cpu_count() or 1) + 1)
+    timings = {n_jobs: measure(lambda: calculate_doublingtimes(dataframe, combine_df=False, n_jobs=n_jobs), repeat, memory=False)['best_s']
+               for n_jobs in jobs}
+    scaling = pd.DataFrame({'best_s': timings}).rename_axis('n_jobs')
+    scaling['speedup'] = scaling['best_s'].iloc[0] / scaling['best_s']
+    return scaling
\ No newline at end of file
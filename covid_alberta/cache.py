@@ -0,0 +1,109 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: 03_cache.ipynb (unless otherwise specified).
+
+__all__ = ['snapshotCache']
+
+# Cell
+import os
+import json
+import hashlib
+from pathlib import Path
+
+# Cell
+class snapshotCache():
+    def __init__(self, folder='covid_cache', max_bytes:int=500 * 2**20):
+        '''
+        on disk cache of covid pages and decoded widgets keyed by the sha256 hash of the page
+
+        Parameters:
+
+            folder:str
+                the folder to save the cache in. Will create the folder if it can't find it
+            max_bytes:int
+                when the cache is bigger than this the least recently used pages get removed
+        '''
+        self.folder = Path(folder)
+        self.max_bytes = max_bytes
+        if not self.folder.is_dir(): self.folder.mkdir(parents=True)
+
+    def _path(self, content_hash:str, kind:str):
+        return self.folder.joinpath(f'{content_hash}.{kind}')
+
+    def _write(self, flpath:Path, data:bytes):
+        '''
+        utility function that writes to a temporary file first so a half written file is never read
+        '''
+        tmp_path = flpath.with_name(flpath.name + '.tmp')
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, flpath)
+
+    def _touch(self, content_hash:str):
+        '''
+        utility function that marks a page as just used. The modified time is used for the LRU
+        '''
+        for flpath in self.folder.glob(f'{content_hash}.*'):
+            os.utime(flpath)
+
+    def __contains__(self, content_hash:str):
+        return self._path(content_hash, 'html').exists()
+
+    def put_page(self, content:bytes):
+        '''
+        add a page to the cache and return its hash
+        '''
+        content_hash = hashlib.sha256(content).hexdigest()
+        if content_hash in self:
+            self._touch(content_hash)
+        else:
+            self._write(self._path(content_hash, 'html'), content)
+            self.evict()
+        return content_hash
+
+    def get_page(self, content_hash:str):
+        '''
+        return the page saved with `content_hash`. Raises a KeyError if it isn't in the cache
+        '''
+        if content_hash not in self:
+            raise KeyError(f'{content_hash} is not in the cache')
+        self._touch(content_hash)
+        return self._path(content_hash, 'html').read_bytes()
+
+    def put_widgets(self, content_hash:str, widgets:dict):
+        '''
+        save the decoded widgets (see `albertaC19.index_widgets`) for a page in the cache
+        '''
+        if content_hash not in self:
+            raise KeyError(f'{content_hash} is not in the cache. Add the page first')
+        self._write(self._path(content_hash, 'widgets.json'), json.dumps(widgets).encode())
+        self.evict()
+
+    def get_widgets(self, content_hash:str):
+        '''
+        return the decoded widgets saved for a page or None if they haven't been saved
+        '''
+        flpath = self._path(content_hash, 'widgets.json')
+        if not flpath.exists():
+            return None
+        self._touch(content_hash)
+        return json.loads(flpath.read_bytes())
+
+    def hashes(self):
+        '''
+        the hashes of the pages in the cache, most recently used first
+        '''
+        pages = sorted(self.folder.glob('*.html'), key=lambda flpath: flpath.stat().st_mtime_ns, reverse=True)
+        return [flpath.name[:-len('.html')] for flpath in pages]
+
+    def size_bytes(self):
+        return sum(flpath.stat().st_size for flpath in self.folder.iterdir() if flpath.is_file())
+
+    def evict(self):
+        '''
+        remove the least recently used pages until the cache is smaller than `max_bytes`. The most
+        recently used page is always kept
+        '''
+        size = self.size_bytes()
+        for content_hash in self.hashes()[1:][::-1]:
+            if size <= self.max_bytes: break
+            for flpath in self.folder.glob(f'{content_hash}.*'):
+                size -= flpath.stat().st_size
+                flpath.unlink()
\ No newline at end of file
@@ -0,0 +1,186 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: 08_cli.ipynb (unless otherwise specified).
+
+__all__ = ['make_parser', 'main']
+
+# Cell
+import sys
+import argparse
+from pathlib import Path
+
+# Cell
+def _scrape(args):
+    '''
+    utility function that runs the `scrape` subcommand
+    '''
+    from .webscraper import albertaC19
+    scraper_kwargs = dict(outputfolder=args.outputfolder, write_mode=args.write_mode)
+    if args.from_file:
+        scraper = albertaC19.from_file(args.from_file, **scraper_kwargs)
+    else:
+        scraper = albertaC19(covid_url=args.url, **scraper_kwargs)
+    totals, regions, testing = scraper.scrape_all(fltypes=args.fltypes, return_dataframes=True)
+    for name, dataframe in zip(('totals', 'regions', 'testing'), (totals, regions, testing)):
+        print(f'{name}: {len(dataframe)} days, last date {dataframe.index.max():%Y-%m-%d}')
+
+def _backfill(args):
+    '''
+    utility function that runs the `backfill` subcommand
+    '''
+    from .backfill import backfill
+    merged, vintages, timings = backfill(args.html_files, outputfolder=args.outputfolder,
+                                         fltypes=args.fltypes, max_workers=args.max_workers)
+    print(timings.to_string())
+
+def _doubling(args):
+    '''
+    utility function that runs the `doubling` subcommand
+    '''
+    if args.block_columns:
+        from .analysis import calculate_doublingtimes_chunked
+        if args.output is None:
+            raise SystemExit('--block-columns needs an --output folder')
+        block_files = calculate_doublingtimes_chunked(args.input, args.output, col_suffix=args.col_suffix,
+                                                      median_incubation_period=args.incubation_period,
+                                                      block_columns=args.block_columns)
+        print(f'wrote {len(block_files)} blocks to {args.output}')
+        return
+    from .webscraper import read_dataframe, albertaC19
+    from .analysis import calculate_doublingtimes
+    dataframe = read_dataframe(args.input)
+    doubling_times = calculate_doublingtimes(dataframe, col_suffix=args.col_suffix,
+                                             median_incubation_period=args.incubation_period,
+                                             combine_df=args.combine)
+    if args.output is None:
+        print(doubling_times.tail().to_string())
+        return
+    output = Path(args.output)
+    writer = albertaC19(outputfolder=output.parent)
+    writer._write_dataframe(doubling_times, output.stem, output.suffix.lstrip('.'))
+
+def _bench(args):
+    '''
+    utility function that runs the `bench` subcommand
+    '''
+    import pandas as pd
+    from .benchmark import run_benchmarks, compare_benchmarks
+    results = run_benchmarks(pages=args.pages, data_folder=args.data_folder, n_days=args.n_days,
+                             n_columns=args.n_columns, repeat=args.repeat, output=args.output)
+    if args.compare:
+        print(compare_benchmarks(args.compare, results).to_string())
+    else:
+        print(pd.DataFrame(results['results']).T.to_string())
+
+def _watch(args):
+    '''
+    utility function that runs the `watch` subcommand
+    '''
+    from .watch import watch
+    watch(covid_url=args.url, outputfolder=args.outputfolder, max_iterations=args.max_iterations,
+          fltypes=args.fltypes, interval=args.interval)
+
+def _report(args):
+    '''
+    utility function that runs the `report` subcommand
+    '''
+    from .webscraper import read_dataframe
+    from .report import reportBuilder
+    data_folder = Path(args.data_folder)
+    data = dict()
+    for name, flname in (('totals', 'alberta_total_data'), ('regions', 'alberta_region_data'), ('testing', 'alberta_testing_data')):
+        flpath = data_folder.joinpath(f'{flname}.{args.fltype}')
+        data[name] = read_dataframe(flpath) if flpath.exists() else None
+    report = reportBuilder(args.outputfolder, max_points=args.max_points, single_page=args.single_page)
+    for name, status in report.build(**data, force=args.force).items():
+        print(f'{name}: {status}')
+
+def _serve(args):
+    '''
+    utility function that runs the `serve` subcommand
+    '''
+    from .server import serve
+    serve(data_folder=args.data_folder, fltype=args.fltype, host=args.host, port=args.port, watch=args.watch,
+          covid_url=args.url, interval=args.interval)
+
+def make_parser():
+    '''
+    the `argparse` parser for the `covid-alberta` command
+    '''
+    parser = argparse.ArgumentParser(prog='covid-alberta', description='scrape and analyze the alberta covid-19 data')
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    subparsers.required = True
+
+    scrape = subparsers.add_parser('scrape', help='scrape the totals, regions and testing data')
+    scrape.add_argument('--url', default='https://covid19stats.alberta.ca/', help='the alberta covid website')
+    scrape.add_argument('--from-file', help='scrape a saved copy of the website instead of downloading it')
+    scrape.add_argument('-o', '--outputfolder', default='data', help='the folder to save the data to')
+    scrape.add_argument('--fltypes', nargs='+', default=['csv', 'json'],
+                        help='filetypes to write: csv json parquet feather sqlite')
+    scrape.add_argument('--write-mode', default='overwrite', choices=('overwrite', 'append', 'upsert'),
+                        help='how to write to files that already exist')
+    scrape.set_defaults(func=_scrape)
+
+    backfill = subparsers.add_parser('backfill', help='rebuild the history from saved copies of the website')
+    backfill.add_argument('html_files', help='a folder of html files or a glob pattern')
+    backfill.add_argument('-o', '--outputfolder', default='data', help='the folder to save the merged data to')
+    backfill.add_argument('--fltypes', nargs='+', default=['csv', 'json'], help='filetypes to write')
+    backfill.add_argument('--max-workers', type=int, default=None, help='number of processes to use')
+    backfill.set_defaults(func=_backfill)
+
+    doubling = subparsers.add_parser('doubling', help='calculate the doubling times of a saved file')
+    doubling.add_argument('input', help='csv, json, parquet or feather file with the cumulative data')
+    doubling.add_argument('--col-suffix', default='cum_cases', help='only use the columns containing this')
+    doubling.add_argument('--incubation-period', type=float, default=5.2, help='median incubation period in days')
+    doubling.add_argument('--combine', action='store_true', help='keep the input columns in the output')
+    doubling.add_argument('-o', '--output', help='file to write to, the file ending picks the filetype. '
+                                                 'Prints the last few rows if not set')
+    doubling.add_argument('--block-columns', type=int, default=None,
+                          help='read and calculate this many columns at a time (csv or parquet input). '
+                               'The blocks are written to the --output folder')
+    doubling.set_defaults(func=_doubling)
+
+    bench = subparsers.add_parser('bench', help='run the benchmarks')
+    bench.add_argument('--pages', nargs='+', default=['testing/alberta_dashboard_sample.html'],
+                       help='saved copies of the website to benchmark')
+    bench.add_argument('--data-folder', default='data', help='folder with the saved totals and regions csv files')
+    bench.add_argument('--n-days', type=int, default=10000, help='days in the synthetic data')
+    bench.add_argument('--n-columns', type=int, default=1000, help='columns in the synthetic data')
+    bench.add_argument('--repeat', type=int, default=3, help='how many times to run each benchmark')
+    bench.add_argument('--output', help='save the results to this json file')
+    bench.add_argument('--compare', help='an older results json file to compare against')
+    bench.set_defaults(func=_bench)
+
+    watch = subparsers.add_parser('watch', help='keep polling the website and write the data when it changes')
+    watch.add_argument('--url', default='https://covid19stats.alberta.ca/', help='the alberta covid website')
+    watch.add_argument('-o', '--outputfolder', default='data', help='the folder to save the data to')
+    watch.add_argument('--fltypes', nargs='+', default=['csv', 'json'], help='filetypes to write')
+    watch.add_argument('--interval', type=float, default=900, help='seconds between polls')
+    watch.add_argument('--max-iterations', type=int, default=None, help='stop after this many polls')
+    watch.set_defaults(func=_watch)
+
+    report = subparsers.add_parser('report', help='write the charts as html pages sharing one plotly.js')
+    report.add_argument('--data-folder', default='data', help='the folder with the saved data')
+    report.add_argument('--fltype', default='csv', help='filetype of the saved data')
+    report.add_argument('-o', '--outputfolder', default='report', help='the folder to write the report to')
+    report.add_argument('--max-points', type=int, default=1000, help='longer traces are downsampled to about this many points')
+    report.add_argument('--single-page', action='store_true', help='write every chart to one index.html')
+    report.add_argument('--force', action='store_true', help='rebuild the charts even if their data did not change')
+    report.set_defaults(func=_report)
+
+    serve = subparsers.add_parser('serve', help='serve the data and doubling times over http from memory')
+    serve.add_argument('--data-folder', default='data', help='the folder with the saved data')
+    serve.add_argument('--fltype', default='csv', help='filetype of the saved data')
+    serve.add_argument('--host', default='127.0.0.1', help='the address to listen on')
+    serve.add_argument('--port', type=int, default=8000, help='the port to listen on')
+    serve.add_argument('--watch', action='store_true', help='poll the website and serve new data when it changes')
+    serve.add_argument('--url', default='https://covid19stats.alberta.ca/', help='the alberta covid website')
+    serve.add_argument('--interval', type=float, default=900, help='seconds between polls with --watch')
+    serve.set_defaults(func=_serve)
+    return parser
+
+def main(argv=None):
+    '''
+    run the `covid-alberta` command. `argv` defaults to the command line arguments
+    '''
+    args = make_parser().parse_args(argv)
+    args.func(args)
+    return 0
\ No newline at end of file
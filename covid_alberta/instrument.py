@@ -0,0 +1,218 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: 09_instrument.ipynb (unless otherwise specified).
+
+__all__ = ['timed_stage', 'metricsRecorder', 'prometheusTextfile']
+
+# Cell
+import os
+import time
+import tempfile
+import threading
+import tracemalloc
+from pathlib import Path
+
+# Cell
+class _nullStage():
+    '''the stage used when there is no recorder. Does nothing'''
+    record = dict()
+    def __enter__(self):
+        return self.record
+    def __exit__(self, *exc_info):
+        self.record.clear()
+        return False
+
+_null_stage = _nullStage()
+
+class _stage():
+    '''times one stage for a `metricsRecorder`'''
+    __slots__ = ('recorder', 'record', 'start', 'start_memory', 'started_tracing')
+
+    def __init__(self, recorder, record:dict):
+        self.recorder = recorder
+        self.record = record
+
+    def __enter__(self):
+        self.started_tracing = False
+        if self.recorder.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+            elif hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            self.start_memory = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.record['seconds'] = time.perf_counter() - self.start
+        if self.recorder.track_memory:
+            self.record['peak_bytes'] = max(tracemalloc.get_traced_memory()[1] - self.start_memory, 0)
+            if self.started_tracing:
+                tracemalloc.stop()
+        if exc_type is not None:
+            self.record['error'] = exc_type.__name__
+        self.recorder.emit(self.record)
+        return False
+
+def timed_stage(metrics, name:str, **labels):
+    '''
+    `metrics.stage(name, **labels)` or a stage that does nothing if `metrics` is None. Used as
+    `with timed_stage(self.metrics, 'fetch') as record: ...`
+    '''
+    if metrics is None:
+        return _null_stage
+    return metrics.stage(name, **labels)
+
+class metricsRecorder():
+    def __init__(self, sinks=None, track_memory:bool=False, keep_records:bool=True):
+        '''
+        record the time, bytes, rows and memory of each stage and pass them on to the sinks
+
+        Parameters:
+
+            sinks:list
+                functions called with each record (a dictionary), see `prometheusTextfile`
+            track_memory:bool
+                if True records the peak python memory of each stage with `tracemalloc`. This slows
+                everything down a lot so it is off by default. Nested stages share the peak
+            keep_records:bool
+                if True keeps every record in `self.records` for `summary`
+        '''
+        self.sinks = list(sinks or [])
+        self.track_memory = track_memory
+        self.keep_records = keep_records
+        self.records = list()
+        self._lock = threading.Lock() # stages can finish on several threads at once (the file writes)
+
+    def add_sink(self, sink):
+        '''
+        add a function that is called with each record
+        '''
+        self.sinks.append(sink)
+
+    def stage(self, name:str, **labels):
+        '''time a stage. Used as a context manager that returns the record so the code being
+        timed can fill in `bytes_in`, `bytes_out` and `rows`
+
+        Parameters:
+
+            name:str
+                the name of the stage
+            labels:
+                extra labels saved with the record, like the filetype or series name
+        '''
+        record = {'stage': name, 'labels': labels, 'seconds': None, 'bytes_in': 0, 'bytes_out': 0,
+                  'rows': 0, 'peak_bytes': None, 'error': None}
+        return _stage(self, record)
+
+    def emit(self, record:dict):
+        '''
+        pass a finished record to the sinks. The sinks are called one record at a time
+        '''
+        with self._lock:
+            if self.keep_records:
+                self.records.append(record)
+            for sink in self.sinks:
+                sink(record)
+
+    def summary(self):
+        '''
+        a dataframe with the number of calls, total seconds, bytes, rows and the largest peak
+        memory of each stage
+        '''
+        import pandas as pd
+        records = pd.DataFrame(self.records, columns=['stage', 'seconds', 'bytes_in', 'bytes_out', 'rows', 'peak_bytes'])
+        return records.groupby('stage', sort=False).agg(calls=('seconds', 'size'), seconds=('seconds', 'sum'),
+                                                       bytes_in=('bytes_in', 'sum'), bytes_out=('bytes_out', 'sum'),
+                                                       rows=('rows', 'sum'), peak_bytes=('peak_bytes', 'max'))
+
+def _escape_label(value):
+    '''
+    utility function that escapes a prometheus label value
+    '''
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class prometheusTextfile():
+    _metrics = (('seconds_total', 'counter', 'wall time spent in the stage'),
+                ('calls_total', 'counter', 'number of times the stage ran'),
+                ('errors_total', 'counter', 'number of times the stage raised an error'),
+                ('bytes_in_total', 'counter', 'bytes read by the stage'),
+                ('bytes_out_total', 'counter', 'bytes written by the stage'),
+                ('rows_total', 'counter', 'rows produced by the stage'),
+                ('last_seconds', 'gauge', 'wall time of the last run of the stage'),
+                ('peak_memory_bytes', 'gauge', 'largest peak python memory of the stage'))
+
+    def __init__(self, flpath, prefix:str='covid_alberta', write_each:bool=True):
+        '''
+        a metrics sink that keeps running totals for each stage and writes them in the prometheus
+        text format for the node_exporter textfile collector. The file is written to a temporary
+        file and then moved so node_exporter never reads half a file
+
+        Parameters:
+
+            flpath:str
+                the `.prom` file to write, usually in the node_exporter `--collector.textfile.directory`
+            prefix:str
+                added to the start of every metric name
+            write_each:bool
+                if True the file is rewritten after every record. Otherwise call `write`
+        '''
+        self.flpath = Path(flpath)
+        self.prefix = prefix
+        self.write_each = write_each
+        self.totals = dict()
+        self._lock = threading.RLock() # the sink can be shared by several recorders
+
+    def __call__(self, record:dict):
+        with self._lock:
+            self._add(record)
+            if self.write_each:
+                self.write()
+
+    def _add(self, record:dict):
+        '''
+        utility function that adds a record to the running totals
+        '''
+        key = (record['stage'],) + tuple(sorted(record['labels'].items()))
+        totals = self.totals.setdefault(key, dict.fromkeys(name for name, _, _ in self._metrics))
+        for name in ('seconds_total', 'calls_total', 'errors_total', 'bytes_in_total', 'bytes_out_total', 'rows_total'):
+            totals[name] = totals[name] or 0
+        totals['seconds_total'] += record['seconds']
+        totals['calls_total'] += 1
+        totals['errors_total'] += record['error'] is not None
+        totals['bytes_in_total'] += record['bytes_in']
+        totals['bytes_out_total'] += record['bytes_out']
+        totals['rows_total'] += record['rows']
+        totals['last_seconds'] = record['seconds']
+        if record['peak_bytes'] is not None:
+            totals['peak_memory_bytes'] = max(totals['peak_memory_bytes'] or 0, record['peak_bytes'])
+
+    def render(self):
+        '''
+        the metrics in the prometheus text format
+        '''
+        with self._lock:
+            stage_totals = [(key, dict(totals)) for key, totals in self.totals.items()]
+        lines = list()
+        for name, metric_type, help_text in self._metrics:
+            metric = f'{self.prefix}_stage_{name}'
+            samples = list()
+            for key, totals in stage_totals:
+                if totals[name] is None:
+                    continue
+                labels = ','.join(f'{label}="{_escape_label(value)}"' for label, value in (('stage', key[0]),) + key[1:])
+                samples.append(f'{metric}{{{labels}}} {totals[name]!r}')
+            if samples:
+                lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {metric_type}'] + samples
+        return '\n'.join(lines) + '\n'
+
+    def write(self):
+        '''
+        write the metrics to `self.flpath`
+        '''
+        self.flpath.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock: # so an older render can't replace a newer one
+            fd, tmp_path = tempfile.mkstemp(dir=self.flpath.parent, prefix=f'.{self.flpath.name}.')
+            with os.fdopen(fd, 'w') as tmp_file:
+                tmp_file.write(self.render())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.flpath)
\ No newline at end of file
@@ -0,0 +1,234 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: 10_report.ipynb (unless otherwise specified).
+
+__all__ = ['downsample', 'frame_hash', 'daily_cases_figure', 'doubling_time_figure', 'report_charts', 'reportBuilder']
+
+# Cell
+import json
+import hashlib
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from .analysis import calculate_doublingtimes
+
+# Cell
+def downsample(values, max_points:int=1000):
+    '''
+    pick the rows of `values` to plot so a long series has at most about `max_points` points.
+    The rows are split into buckets and the smallest and largest value of each bucket is kept,
+    along with the first and last rows, so the shape of the series (its peaks and dips) survives.
+    NaN values are only picked when a whole bucket is NaN
+
+    ----
+    Returns:
+
+        rows:np.ndarray
+            the sorted positions of the rows to keep
+    '''
+    values = np.asarray(values, dtype=float)
+    n_rows = len(values)
+    if n_rows <= max_points:
+        return np.arange(n_rows)
+    n_buckets = max(max_points // 2 - 1, 1)
+    inner = values[1:-1]
+    bucket_size = -(-len(inner) // n_buckets)
+    padded = np.full(n_buckets * bucket_size, np.nan)
+    padded[:len(inner)] = inner
+    padded = padded.reshape(n_buckets, bucket_size)
+    missing = np.isnan(padded)
+    starts = np.arange(n_buckets) * bucket_size + 1
+    lows = starts + np.where(missing, np.inf, padded).argmin(axis=1)
+    highs = starts + np.where(missing, -np.inf, padded).argmax(axis=1)
+    rows = np.concatenate([[0], lows, highs, [n_rows - 1]])
+    return np.unique(rows[rows < n_rows])
+
+def frame_hash(*frames, **params):
+    '''
+    a hash of the values, index and columns of `frames` (None is allowed) and of the json friendly
+    `params`. Used to find out if a chart needs to be rebuilt
+    '''
+    digest = hashlib.sha1()
+    for frame in frames:
+        if frame is None:
+            digest.update(b'None')
+            continue
+        digest.update(json.dumps([str(col) for col in frame.columns]).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+# Cell
+def _trace_data(series:pd.Series, max_points:int, decimals:int, x=None):
+    '''
+    utility function that downsamples a series and returns the compact x and y arrays to plot.
+    Dates are written as `YYYY-MM-DD` strings and the values are rounded to `decimals`
+    '''
+    series = series.dropna() if x is None else series
+    rows = downsample(series.to_numpy(dtype=float), max_points)
+    if x is None:
+        x_values = pd.DatetimeIndex(series.index[rows]).strftime('%Y-%m-%d').to_numpy()
+    else:
+        x_values = np.asarray(x, dtype=float)[rows]
+    return x_values, np.round(series.to_numpy(dtype=float)[rows], decimals)
+
+def daily_cases_figure(totals:pd.DataFrame, testing:pd.DataFrame, max_points:int=1000, decimals:int=2):
+    '''
+    the daily cases (line) and the tests per day (bars) of the `scrape_albertaTotals` and
+    `scrape_albertaTesting` data
+    '''
+    import plotly.graph_objects as go
+    cases_x, cases_y = _trace_data(totals['Daily_count'], max_points, decimals)
+    tests_x, tests_y = _trace_data(testing['test_count'], max_points, decimals)
+    updated = max(totals.index[-1], testing.index[-1]).strftime('%B %d')
+    fig = go.Figure([go.Bar(x=tests_x, y=tests_y, name='C19 Tests/day', yaxis='y2', marker={'color': 'darkgrey'}),
+                     go.Scatter(x=cases_x, y=cases_y, mode='lines', name='Alberta Daily',
+                                line={'color': 'green', 'width': 2})])
+    fig.update_layout(title=f'{updated} - Alberta Covid-19: Case Counts and Number of Tests',
+                      xaxis={'domain': [0.01, 0.95], 'title': 'Date', 'type': 'date'},
+                      yaxis={'title': 'Case Count', 'overlaying': 'y2', 'side': 'right', 'rangemode': 'nonnegative'},
+                      yaxis2={'domain': [0.1, 0.95], 'title': 'New Tests per Day', 'showgrid': False,
+                              'side': 'left', 'rangemode': 'nonnegative'},
+                      legend_orientation='h', hovermode='x')
+    return fig
+
+def doubling_time_figure(totals:pd.DataFrame, regions:pd.DataFrame, region_names=('Calgary', 'Edmont'),
+                         median_incubation_period:float=5.2, max_points:int=1000, decimals:int=2):
+    '''
+    the rolling window doubling time against the cumulative cases for all of Alberta and the
+    `region_names` of the `scrape_albertaRegions` data
+    '''
+    import plotly.graph_objects as go
+    lines = [('Alberta', totals['cum_cases'], calculate_doublingtimes(totals, col_suffix='cum_cases',
+             median_incubation_period=median_incubation_period, combine_df=False)['dtime_rw'])]
+    region_cum = regions[[f'{name}_cumulative' for name in region_names]]
+    region_dt = calculate_doublingtimes(region_cum, col_suffix='cumulative', combine_df=False,
+                                        median_incubation_period=median_incubation_period)
+    lines += [(name, region_cum[f'{name}_cumulative'], region_dt[f'{name}_dtime_rw']) for name in region_names]
+    fig = go.Figure()
+    for name, cumulative, dtime in lines:
+        valid = dtime.notna().to_numpy()
+        x_values, y_values = _trace_data(dtime[valid], max_points, decimals, x=cumulative.to_numpy()[valid])
+        fig.add_trace(go.Scatter(x=x_values, y=y_values, mode='lines', name=name, hovertemplate='dt: %{y:0.2f}'))
+    updated = max(totals.index[-1], regions.index[-1]).strftime('%B %d')
+    fig.update_layout(title=f'{updated} - Doubling Time: rolling window',
+                      xaxis={'title': 'Cumulative Case Count', 'rangemode': 'nonnegative'},
+                      yaxis={'title': 'Doubling Time (Days)', 'rangemode': 'nonnegative'},
+                      legend_orientation='v', hovermode='x')
+    return fig
+
+report_charts = {
+    'daily_cases': {'figure': daily_cases_figure, 'inputs': ('totals', 'testing')},
+    'doubling_time': {'figure': doubling_time_figure, 'inputs': ('totals', 'regions')},
+}
+
+# Cell
+class reportBuilder():
+    def __init__(self, outputfolder:str='report', charts:dict=None, max_points:int=1000, decimals:int=2,
+                 single_page:bool=False, title:str='Alberta Covid-19'):
+        '''
+        write the standard charts as html pages that share one plotly.js bundle
+
+        Parameters:
+
+            outputfolder:str
+                the folder to write the pages, `plotly.min.js` and `report_hashes.json` to
+            charts:dict
+                name: {'figure': function, 'inputs': names of the data sets}. The function is called with
+                the data sets and `max_points`, `decimals` and returns a plotly figure. Defaults to `report_charts`
+            max_points:int
+                roughly the most points in a trace, longer series are downsampled (see `downsample`)
+            decimals:int
+                the plotted values are rounded to this many decimals
+            single_page:bool
+                if True all the charts are written to `index.html`, otherwise each chart gets `<name>.html`
+            title:str
+                the title of the single page
+        '''
+        self.outputfolder = Path(outputfolder)
+        self.charts = report_charts if charts is None else charts
+        self.max_points = max_points
+        self.decimals = decimals
+        self.single_page = single_page
+        self.title = title
+        self.hash_path = self.outputfolder / 'report_hashes.json'
+
+    def _read_hashes(self):
+        '''
+        utility function that reads the hashes of the last build
+        '''
+        if not self.hash_path.exists():
+            return dict()
+        return json.loads(self.hash_path.read_text())
+
+    def _write_bundle(self, hashes:dict):
+        '''
+        utility function that writes `plotly.min.js` if it is missing or from another plotly version
+        '''
+        import plotly
+        from plotly.offline import get_plotlyjs
+        bundle = self.outputfolder / 'plotly.min.js'
+        if bundle.exists() and hashes.get('plotly.min.js') == plotly.__version__:
+            return False
+        bundle.write_text(get_plotlyjs(), encoding='utf-8')
+        hashes['plotly.min.js'] = plotly.__version__
+        return True
+
+    def _figure(self, name:str, data:dict):
+        '''
+        utility function that builds the figure of chart `name`
+        '''
+        chart = self.charts[name]
+        return chart['figure'](*[data[source] for source in chart['inputs']],
+                               max_points=self.max_points, decimals=self.decimals)
+
+    def build(self, totals:pd.DataFrame=None, regions:pd.DataFrame=None, testing:pd.DataFrame=None, force:bool=False):
+        '''
+        write the charts whose data changed since the last build
+
+        Parameters:
+
+            totals, regions, testing:pd.DataFrame
+                the data from `scrape_albertaTotals`, `scrape_albertaRegions` and `scrape_albertaTesting`.
+                Charts that need a missing data set are left out
+            force:bool
+                if True every chart is rebuilt
+
+        ----
+        Returns:
+
+            statuses:dict
+                chart name: `written`, `unchanged` or `missing` (it needs data that wasn't passed)
+        '''
+        self.outputfolder.mkdir(parents=True, exist_ok=True)
+        data = {'totals': totals, 'regions': regions, 'testing': testing}
+        hashes = self._read_hashes()
+        self._write_bundle(hashes)
+        statuses, new_hashes = dict(), dict()
+        for name, chart in self.charts.items():
+            if any(data[source] is None for source in chart['inputs']):
+                statuses[name] = 'missing'
+                continue
+            new_hashes[name] = frame_hash(*[data[source] for source in chart['inputs']], chart=name,
+                                          max_points=self.max_points, decimals=self.decimals)
+            page = self.outputfolder / f'{name}.html'
+            unchanged = hashes.get(name) == new_hashes[name] and (self.single_page or page.exists())
+            statuses[name] = 'unchanged' if unchanged and not force else 'written'
+        if self.single_page:
+            page_hash = frame_hash(None, charts=new_hashes, title=self.title)
+            if force or hashes.get('index.html') != page_hash or not (self.outputfolder / 'index.html').exists():
+                divs = [self._figure(name, data).to_html(full_html=False, include_plotlyjs=False)
+                        for name in new_hashes]
+                page = (f'<html>\n<head><meta charset="utf-8" /><title>{self.title}</title>'
+                        f'<script src="plotly.min.js"></script></head>\n<body>\n' + '\n'.join(divs) + '\n</body>\n</html>')
+                (self.outputfolder / 'index.html').write_text(page, encoding='utf-8')
+                statuses.update({name: 'written' for name in new_hashes})
+            else:
+                statuses.update({name: 'unchanged' for name in new_hashes})
+            hashes['index.html'] = page_hash
+        else:
+            for name in new_hashes:
+                if statuses[name] == 'written':
+                    html = self._figure(name, data).to_html(include_plotlyjs='directory')
+                    (self.outputfolder / f'{name}.html').write_text(html, encoding='utf-8')
+        hashes.update(new_hashes)
+        self.hash_path.write_text(json.dumps(hashes, indent=1))
+        return statuses
\ No newline at end of file
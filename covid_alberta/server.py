@@ -0,0 +1,320 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: 11_server.ipynb (unless otherwise specified).
+
+__all__ = ['dataSnapshot', 'seriesServer', 'serve']
+
+# Cell
+import json
+import gzip
+import hashlib
+import threading
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pandas as pd
+from .webscraper import read_dataframe
+from .analysis import calculate_doublingtimes
+
+# Cell
+def _parse_date(value:str, name:str):
+    '''
+    utility function that parses a `start` or `end` query value, raising a ValueError naming it
+    '''
+    try:
+        return pd.Timestamp(value)
+    except (ValueError, TypeError):
+        raise ValueError(f'{name} must be a date like 2020-04-01, not {value!r}')
+
+class dataSnapshot():
+    def __init__(self, frames:dict, version:int=0, max_rendered:int=256):
+        '''
+        an unchanging set of dataframes to serve. The frames are copied so changing the originals
+        doesn't change the snapshot
+
+        Parameters:
+
+            frames:dict
+                series name: dataframe with a sorted date index
+            version:int
+                increases by one with each published snapshot
+            max_rendered:int
+                how many rendered responses to keep. The saved responses are all dropped when it is full
+        '''
+        self.frames = {name: frame.sort_index().copy() for name, frame in frames.items()}
+        self.version = version
+        self.created = pd.Timestamp.now(tz='UTC')
+        self.max_rendered = max_rendered
+        self.hashes = dict()
+        for name, frame in self.frames.items():
+            digest = hashlib.sha1(json.dumps([str(col) for col in frame.columns]).encode())
+            digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+            self.hashes[name] = digest.hexdigest()
+        self._rendered = dict()
+        self._gzipped = dict()
+
+    def index(self):
+        '''
+        the json friendly description of the series in the snapshot
+        '''
+        return {'version': self.version, 'created': self.created.isoformat(),
+                'series': {name: {'columns': [str(col) for col in frame.columns], 'rows': len(frame),
+                                  'start': frame.index[0].strftime('%Y-%m-%d') if len(frame) else None,
+                                  'end': frame.index[-1].strftime('%Y-%m-%d') if len(frame) else None,
+                                  'etag': f'"{self.hashes[name]}"'}
+                           for name, frame in self.frames.items()}}
+
+    def select(self, name:str, start=None, end=None, columns=None):
+        '''
+        the rows of series `name` from `start` to `end` (both included, either can be None) and only
+        `columns` (all if None). Raises a KeyError for an unknown series and a ValueError for bad arguments
+        '''
+        frame = self.frames[name]
+        start = None if start is None else _parse_date(start, 'start')
+        end = None if end is None else _parse_date(end, 'end')
+        if columns is not None:
+            missing = [col for col in columns if col not in frame.columns]
+            if missing:
+                raise ValueError(f'{name} has no columns {missing}')
+            frame = frame[list(columns)]
+        first = 0 if start is None else frame.index.searchsorted(start, side='left')
+        last = len(frame) if end is None else frame.index.searchsorted(end, side='right')
+        return frame.iloc[first:last]
+
+    def render(self, name:str, start=None, end=None, columns=None, fmt:str='json'):
+        '''
+        the (etag, content type, body) of a slice of series `name` (see `select`) as json or csv.
+        Rendered responses are saved so rendering the same slice again is free
+        '''
+        if fmt not in ('json', 'csv'):
+            raise ValueError(f'format must be json or csv, not {fmt!r}')
+        key = (name, start, end, None if columns is None else tuple(columns), fmt)
+        rendered = self._rendered.get(key)
+        if rendered is None:
+            frame = self.select(name, start, end, columns)
+            if fmt == 'json':
+                # like the json files `albertaC19` writes, repeated dates (the long layout) need `split`
+                orient = 'columns' if frame.index.is_unique else 'split'
+                body, content_type = frame.to_json(orient=orient).encode(), 'application/json'
+            else:
+                body, content_type = frame.to_csv().encode(), 'text/csv; charset=utf-8'
+            etag = hashlib.sha1(f'{self.hashes[name]}{key!r}'.encode()).hexdigest()
+            rendered = (f'"{etag}"', content_type, body)
+            if len(self._rendered) >= self.max_rendered:
+                self._rendered = dict()
+            self._rendered[key] = rendered
+        return rendered
+
+    def gzipped(self, etag:str, body:bytes, level:int=6):
+        '''
+        the gzipped `body` of the response with `etag`, saved so each response is only compressed once
+        '''
+        compressed = self._gzipped.get(etag)
+        if compressed is None:
+            compressed = gzip.compress(body, compresslevel=level, mtime=0)
+            if len(self._gzipped) >= self.max_rendered:
+                self._gzipped = dict()
+            self._gzipped[etag] = compressed
+        return compressed
+
+# Cell
+def _etag_matches(if_none_match:str, etag:str):
+    '''
+    utility function that checks an `If-None-Match` header against an etag. Weak etags and the
+    gzipped and plain versions of the same etag also match
+    '''
+    if if_none_match is None:
+        return False
+    etag = etag.replace('-gzip"', '"')
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*':
+            return True
+        tag = tag[2:] if tag.startswith('W/') else tag
+        if tag.replace('-gzip"', '"') == etag:
+            return True
+    return False
+
+class _seriesHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.owner.log is not None:
+            self.server.owner.log(format % args)
+
+    def _send(self, status:int, body:bytes=b'', content_type:str='application/json', etag:str=None,
+              snapshot:dataSnapshot=None):
+        '''
+        utility function that sends a response, gzipped if the client accepts it and it is big enough.
+        Responses with an etag are compressed once and saved on the `snapshot`
+        '''
+        owner = self.server.owner
+        gzipped = (status == 200 and len(body) >= owner.gzip_min_bytes
+                   and 'gzip' in self.headers.get('Accept-Encoding', ''))
+        if gzipped and etag is not None:
+            etag = etag[:-1] + '-gzip"'
+        if etag is not None and _etag_matches(self.headers.get('If-None-Match'), etag):
+            status, body, gzipped = 304, b'', False
+        if gzipped:
+            body = (snapshot.gzipped(etag, body, owner.gzip_level) if snapshot is not None and etag is not None
+                    else gzip.compress(body, compresslevel=owner.gzip_level, mtime=0))
+        self.send_response(status)
+        if status != 304:
+            self.send_header('Content-Type', content_type)
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        if etag is not None:
+            self.send_header('ETag', etag)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _error(self, status:int, message:str):
+        self._send(status, json.dumps({'error': message}).encode())
+
+    def do_GET(self):
+        snapshot = self.server.owner.snapshot # read once so the whole request uses one snapshot
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        if not parts or parts[0] != 'series' or len(parts) > 2:
+            return self._error(404, f'{url.path} not found, use /series or /series/<name>')
+        if snapshot is None:
+            return self._error(503, 'no data has been published yet')
+        if len(parts) == 1:
+            body = json.dumps(snapshot.index()).encode()
+            etag = '"' + hashlib.sha1(' '.join(snapshot.hashes.values()).encode()).hexdigest() + '"'
+            return self._send(200, body, etag=etag, snapshot=snapshot)
+        name = parts[1]
+        fmt = 'json'
+        if name not in snapshot.frames and name.rsplit('.', 1)[-1] in ('json', 'csv'):
+            name, fmt = name.rsplit('.', 1)
+        if name not in snapshot.frames:
+            return self._error(404, f'unknown series {name}, choose from {list(snapshot.frames)}')
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        columns = query['columns'].split(',') if query.get('columns') else None
+        try:
+            etag, content_type, body = snapshot.render(name, query.get('start'), query.get('end'), columns,
+                                                       query.get('format', fmt))
+        except ValueError as error:
+            return self._error(400, str(error))
+        self._send(200, body, content_type, etag, snapshot)
+
+    do_HEAD = do_GET
+
+# Cell
+class seriesServer():
+    def __init__(self, host:str='127.0.0.1', port:int=8000, doubling_suffixes:dict=None,
+                 gzip_min_bytes:int=1024, gzip_level:int=6, log=None):
+        '''
+        serve the latest scraped data and doubling times over http from an in memory snapshot
+
+        Parameters:
+
+            host:str
+                the address to listen on
+            port:int
+                the port to listen on, 0 picks a free port (see `url`)
+            doubling_suffixes:dict
+                series: `col_suffix` for the series that get their doubling times served as
+                `<series>_doublingtimes`. Defaults to the cumulative columns of the totals and regions
+            gzip_min_bytes:int
+                smaller responses are never gzipped
+            gzip_level:int
+                the gzip compression level
+            log:
+                called with a line for each request, None to not log requests
+        '''
+        if doubling_suffixes is None:
+            doubling_suffixes = {'totals': 'cum_cases', 'regions': 'cumulative'}
+        self.doubling_suffixes = doubling_suffixes
+        self.gzip_min_bytes = gzip_min_bytes
+        self.gzip_level = gzip_level
+        self.log = log
+        self.snapshot = None
+        self.httpd = ThreadingHTTPServer((host, port), _seriesHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.owner = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def publish(self, totals:pd.DataFrame=None, regions:pd.DataFrame=None, testing:pd.DataFrame=None, **series):
+        '''
+        make a new snapshot from the `albertaC19` outputs (and any other named `series`), work out
+        their doubling times and swap it in for the old snapshot. Series that are None are left out
+
+        ----
+        Returns:
+
+            snapshot:dataSnapshot
+        '''
+        frames = {name: frame for name, frame in dict(totals=totals, regions=regions, testing=testing, **series).items()
+                  if frame is not None}
+        for name, col_suffix in self.doubling_suffixes.items():
+            if name in frames:
+                frames[f'{name}_doublingtimes'] = calculate_doublingtimes(frames[name], col_suffix=col_suffix,
+                                                                          combine_df=False)
+        version = 1 if self.snapshot is None else self.snapshot.version + 1
+        snapshot = dataSnapshot(frames, version=version)
+        self.snapshot = snapshot # one assignment so readers see the old or the new snapshot, never a mix
+        return snapshot
+
+    def start(self):
+        '''
+        serve requests on a background thread and return the thread
+        '''
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='seriesServer', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        '''
+        stop serving and close the socket
+        '''
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+def serve(data_folder:str='data', fltype:str='csv', host:str='127.0.0.1', port:int=8000, watch:bool=False,
+          covid_url:str='https://covid19stats.alberta.ca/', interval:float=900, max_iterations:int=None):
+    '''
+    publish the saved data in `data_folder` and serve it. With `watch` the website is polled (see
+    `dashboardWatcher`) and a new snapshot is published whenever the data changes, otherwise it
+    serves until stopped
+    '''
+    server = seriesServer(host, port, log=print)
+    data_folder = Path(data_folder)
+    saved = dict()
+    for name, flname in (('totals', 'alberta_total_data'), ('regions', 'alberta_region_data'), ('testing', 'alberta_testing_data')):
+        flpath = data_folder.joinpath(f'{flname}.{fltype}')
+        saved[name] = read_dataframe(flpath) if flpath.exists() else None
+    if any(frame is not None for frame in saved.values()):
+        server.publish(**saved)
+    print(f'serving on {server.url}')
+    if not watch:
+        try:
+            server.serve_forever()
+        finally:
+            server.httpd.server_close()
+        return
+    from .watch import dashboardWatcher, print_event
+
+    def on_event(event):
+        print_event(event)
+        if event['status'] == 'changed':
+            server.publish(**watcher.snapshot)
+
+    watcher = dashboardWatcher(covid_url, outputfolder=data_folder, on_event=on_event, interval=interval)
+    server.start()
+    try:
+        watcher.run(max_iterations)
+    finally:
+        server.stop()
\ No newline at end of file
@@ -0,0 +1,166 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: 02_store.ipynb (unless otherwise specified).
+
+__all__ = ['seriesStore']
+
+# Cell
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Cell
+def _utc_timestamp(timestamp):
+    '''
+    utility function that turns a timestamp into a fixed width UTC string so timestamps sort by time
+    in sqlite. Timestamps without a timezone are taken to be UTC
+    '''
+    timestamp = pd.Timestamp(timestamp)
+    timestamp = timestamp.tz_localize('UTC') if timestamp.tzinfo is None else timestamp.tz_convert('UTC')
+    return timestamp.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+class seriesStore():
+    def __init__(self, db_path):
+        '''
+        sqlite database of the scraped data. Rows are keyed by the series name, the date, the time it was
+        scraped and the column name so the history of each value is kept
+
+        Parameters:
+
+            db_path:str
+                the sqlite file. Will be created if it doesn't exist
+        '''
+        self.db_path = Path(db_path)
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._transaction_depth = 0
+        with self.conn:
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS observations (
+                                     series TEXT NOT NULL, date TEXT NOT NULL, scrape_timestamp TEXT NOT NULL,
+                                     field TEXT NOT NULL, value REAL,
+                                     PRIMARY KEY (series, date, scrape_timestamp, field))''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS observations_date ON observations (date)')
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS fields (
+                                     series TEXT NOT NULL, field TEXT NOT NULL, position INTEGER NOT NULL,
+                                     PRIMARY KEY (series, field))''')
+
+    @contextmanager
+    def transaction(self):
+        '''
+        group several `insert` calls into one transaction, used as `with store.transaction(): ...`.
+        The inserts are committed together at the end, or all rolled back if there is an error
+        '''
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self.conn.rollback()
+            raise
+        self._transaction_depth -= 1
+        if self._transaction_depth == 0:
+            self.conn.commit()
+
+    def insert(self, series:str, dataframe:pd.DataFrame, scrape_timestamp=None):
+        '''
+        add a scraped dataframe to the store in one transaction (or as part of the `transaction` it is
+        called in). Only the values that are new or have changed since the last scrape get added
+
+        Parameters:
+
+            series:str
+                name of the series, for example the output filename `alberta_total_data`
+            dataframe:pd.DataFrame
+                the scraped data with the dates as the index
+            scrape_timestamp:[str or pd.Timestamp]
+                when the data was scraped. If None will use the current time. Timestamps without a
+                timezone are taken to be UTC
+
+        ----
+        Returns:
+
+            n_rows:int
+                the number of values added
+        '''
+        scrape_timestamp = _utc_timestamp(pd.Timestamp.utcnow() if scrape_timestamp is None else scrape_timestamp)
+        new_values = self._to_long(dataframe)
+        if dataframe.empty:
+            return 0
+        # only the stored values for the dates being added are needed to find what changed
+        dates = pd.DatetimeIndex(dataframe.index)
+        latest = self._to_long(self.load(series, start=dates.min(), end=dates.max()))
+        if not latest.empty:
+            merged = new_values.merge(latest, on=['date', 'field'], how='left', suffixes=('', '_latest'), indicator=True)
+            unchanged = (merged['value'] == merged['value_latest']) | (merged['value'].isna() & merged['value_latest'].isna()
+                                                                      & (merged['_merge'] == 'both'))
+            new_values = new_values[~unchanged.to_numpy()]
+
+        rows = zip([series] * len(new_values), new_values['date'],
+                   [scrape_timestamp] * len(new_values), new_values['field'],
+                   new_values['value'].astype(object).where(new_values['value'].notna(), None))
+        with self.transaction():
+            self.conn.executemany('INSERT OR REPLACE INTO observations VALUES (?, ?, ?, ?, ?)', rows)
+            self.conn.executemany('INSERT OR IGNORE INTO fields VALUES (?, ?, ?)',
+                                  [(series, field, position) for position, field in enumerate(dataframe.columns)])
+        return len(new_values)
+
+    @staticmethod
+    def _to_long(dataframe:pd.DataFrame):
+        '''
+        utility function that turns a date indexed dataframe into date, field, value rows
+        '''
+        long_df = dataframe.rename_axis(index='date', columns='field').stack(dropna=False).rename('value').reset_index()
+        long_df['date'] = pd.DatetimeIndex(long_df['date']).strftime('%Y-%m-%d')
+        long_df['value'] = long_df['value'].astype(float)
+        return long_df
+
+    def load(self, series:str, start=None, end=None, as_of=None):
+        '''
+        load a series from the store
+
+        Parameters:
+
+            series:str
+                name of the series
+            start, end:[str or pd.Timestamp]
+                the first and last dates to load. If None will load from the start/to the end
+            as_of:[str or pd.Timestamp]
+                load the values as they were at this time (UTC if it has no timezone). If None will load
+                the latest values
+
+        ----
+        Returns:
+
+            dataframe:pd.DataFrame
+                the series with the dates as the index and the columns in the order they were scraped
+        '''
+        query = '''SELECT date, field, value FROM observations AS obs
+                   WHERE series = :series AND date >= :start AND date <= :end AND scrape_timestamp = (
+                       SELECT MAX(scrape_timestamp) FROM observations
+                       WHERE series = obs.series AND date = obs.date AND field = obs.field
+                       AND scrape_timestamp <= :as_of)'''
+        params = {'series': series,
+                  'start': '0000-00-00' if start is None else f'{pd.Timestamp(start):%Y-%m-%d}',
+                  'end': '9999-99-99' if end is None else f'{pd.Timestamp(end):%Y-%m-%d}',
+                  'as_of': '9999' if as_of is None else _utc_timestamp(as_of)}
+        long_df = pd.read_sql_query(query, self.conn, params=params)
+        fields = [field for field, in self.conn.execute('SELECT field FROM fields WHERE series = ? ORDER BY position',
+                                                        (series,))]
+        dataframe = long_df.pivot(index='date', columns='field', values='value')
+        dataframe = dataframe.reindex(columns=[field for field in fields if field in dataframe.columns])
+        dataframe.index = pd.DatetimeIndex(dataframe.index)
+        dataframe = dataframe.rename_axis(index=None, columns=None)
+        # the values are stored as floats. Switch the columns back to int when we can
+        for column in dataframe.columns:
+            if dataframe[column].notna().all() and (dataframe[column] % 1 == 0).all():
+                dataframe[column] = dataframe[column].astype(np.int64)
+        return dataframe
+
+    def list_series(self):
+        '''
+        the names of all the series in the store
+        '''
+        return [series for series, in self.conn.execute('SELECT DISTINCT series FROM fields ORDER BY series')]
+
+    def close(self):
+        self.conn.close()
\ No newline at end of file
@@ -0,0 +1,181 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: 07_watch.ipynb (unless otherwise specified).
+
+__all__ = ['diff_frames', 'print_event', 'dashboardWatcher', 'watch']
+
+# Cell
+import json
+import time
+import random
+import traceback
+import numpy as np
+import pandas as pd
+from .webscraper import albertaC19, read_dataframe
+from .analysis import calculate_doublingtimes
+
+# Cell
+def diff_frames(old:pd.DataFrame, new:pd.DataFrame):
+    '''
+    find the dates and columns where `new` is different from `old`. Dates or columns that were
+    added or removed count as changed. If `old` is None everything in `new` is changed
+
+    ----
+    Returns:
+
+        changes:dict
+            `dates` and `columns` lists of what changed. Dates are `YYYY-MM-DD` strings
+    '''
+    if old is None:
+        dates, columns = new.index, new.columns
+    else:
+        old_values = old.reindex(index=new.index, columns=new.columns).to_numpy(dtype=float)
+        changed = ~np.isclose(old_values, new.to_numpy(dtype=float), rtol=0, atol=0, equal_nan=True)
+        dates = new.index[changed.any(axis=1)].union(old.index.difference(new.index))
+        columns = [col for col, col_changed in zip(new.columns, changed.any(axis=0)) if col_changed]
+        columns += [col for col in old.columns if col not in new.columns]
+    return {'dates': [pd.Timestamp(date).strftime('%Y-%m-%d') for date in dates], 'columns': list(columns)}
+
+def print_event(event:dict):
+    '''
+    the default event sink. Prints the event as one line of json
+    '''
+    print(json.dumps(event))
+
+class dashboardWatcher():
+    def __init__(self, covid_url:str='https://covid19stats.alberta.ca/', outputfolder:str='data',
+                 fltypes=('csv', 'json'), interval:float=900, max_interval:float=3600, backoff:float=2,
+                 jitter:float=0.1, doubling_suffixes:dict=None, on_event=print_event,
+                 totalfl:str='alberta_total_data', regionsfl:str='alberta_region_data',
+                 testfl:str='alberta_testing_data', sleep=time.sleep, scraper_kwargs:dict=None):
+        '''
+        poll the alberta covid website and only write the data when it changes
+
+        Parameters:
+
+            covid_url:str
+                the url for the alberta covid website
+            outputfolder:str
+                the folder to save the data to
+            fltypes:[list or str]
+                the filetypes to write, see `albertaC19._write_dataframe`. The first one is also read
+                at start up so a restarted watcher doesn't rewrite unchanged files
+            interval:float
+                seconds between polls
+            max_interval:float
+                the longest wait between polls when backing off after errors
+            backoff:float
+                the wait is multiplied by this after each error in a row
+            jitter:float
+                the wait is randomly changed by up to this fraction (0.1 is +/- 10%)
+            doubling_suffixes:dict
+                series: `col_suffix` for the series that get doubling times written (to `<filename>_doublingtimes`)
+                when they change. Defaults to the cumulative columns of the totals and regions. Use `{}` for none
+            on_event:
+                called with the event dictionary after each poll. Defaults to printing it as json
+            totalfl, regionsfl, testfl:str
+                filenames without the file ending
+            sleep:
+                the function used to wait between polls
+            scraper_kwargs:dict
+                extra arguments passed to `albertaC19`, like `html_update_ids`
+        '''
+        self.scraper = albertaC19(covid_url=covid_url, outputfolder=outputfolder, **(scraper_kwargs or {}))
+        self.fltypes = [fltypes] if isinstance(fltypes, str) else fltypes
+        self.interval = interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        if doubling_suffixes is None:
+            doubling_suffixes = {'totals': 'cum_cases', 'regions': 'cumulative'}
+        self.doubling_suffixes = doubling_suffixes
+        self.on_event = on_event
+        self.filenames = {'totals': totalfl, 'regions': regionsfl, 'testing': testfl}
+        self.sleep = sleep
+        self.errors = 0
+        self.iteration = 0
+        self.snapshot = {name: self._read_last(filename) for name, filename in self.filenames.items()}
+
+    def _read_last(self, filename:str):
+        '''
+        utility function that reads the data written by an earlier run. Returns None if there isn't any
+        '''
+        if not self.fltypes:
+            return None
+        flpath = self.scraper._output_path(filename, self.fltypes[0])
+        try:
+            return read_dataframe(flpath)
+        except Exception:
+            return None
+
+    def next_delay(self):
+        '''
+        seconds to wait before the next poll. Backs off after errors and adds the jitter
+        '''
+        delay = min(self.interval * self.backoff ** self.errors, self.max_interval)
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def poll(self):
+        '''check the website once, write whatever changed and return the event
+
+        ----
+        Returns:
+
+            event:dict
+                `iteration`, `time`, `status` (`changed`, `unchanged`, `not_modified` or `error`),
+                `changes` (series: dates and columns that changed), `error` and `seconds`
+        '''
+        self.iteration += 1
+        start = time.perf_counter()
+        event = {'iteration': self.iteration, 'time': pd.Timestamp.now(tz='UTC').isoformat(),
+                 'status': 'unchanged', 'changes': {}, 'error': None}
+        try:
+            if self.scraper.content is not None and not self.scraper.fetch():
+                event['status'] = 'not_modified'
+            else:
+                dataframes = self.scraper.scrape_all(fltypes=None, return_dataframes=True)
+                for name, dataframe in zip(self.filenames, dataframes):
+                    changes = diff_frames(self.snapshot[name], dataframe)
+                    if not changes['dates'] and not changes['columns']:
+                        continue
+                    self._write_series(name, dataframe)
+                    self.snapshot[name] = dataframe
+                    event['changes'][name] = changes
+                if event['changes']:
+                    event['status'] = 'changed'
+            self.errors = 0
+        except Exception as error:
+            self.errors += 1
+            event['status'] = 'error'
+            event['error'] = ''.join(traceback.format_exception_only(type(error), error)).strip()
+        event['seconds'] = time.perf_counter() - start
+        if self.on_event is not None:
+            self.on_event(event)
+        return event
+
+    def _write_series(self, name:str, dataframe:pd.DataFrame):
+        '''
+        utility function that writes a changed series and its doubling times
+        '''
+        filename = self.filenames[name]
+        self.scraper._write_dataframe(dataframe, filename, self.fltypes)
+        if name in self.doubling_suffixes:
+            doubling_times = calculate_doublingtimes(dataframe, col_suffix=self.doubling_suffixes[name], combine_df=False)
+            self.scraper._write_dataframe(doubling_times, f'{filename}_doublingtimes', self.fltypes)
+
+    def run(self, max_iterations:int=None):
+        '''
+        poll the website until stopped (or `max_iterations` polls are done), waiting `next_delay`
+        seconds between polls. Returns the last event
+        '''
+        event = None
+        while max_iterations is None or self.iteration < max_iterations:
+            event = self.poll()
+            if max_iterations is not None and self.iteration >= max_iterations:
+                break
+            self.sleep(self.next_delay())
+        return event
+
+def watch(covid_url:str='https://covid19stats.alberta.ca/', outputfolder:str='data', max_iterations:int=None, **kwargs):
+    '''
+    make a `dashboardWatcher` and run it. `kwargs` are passed to `dashboardWatcher`
+    '''
+    return dashboardWatcher(covid_url=covid_url, outputfolder=outputfolder, **kwargs).run(max_iterations)
\ No newline at end of file
@@ -1,21 +1,423 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: 00_webscraper.ipynb (unless otherwise specified).
 
-__all__ = ['albertaC19']
+__all__ = ['get_session', 'extract_section_scripts', 'read_dataframe', 'write_modes', 'compressions', 'traces_to_frame',
+           'widgetExtractor', 'widget_specs', 'albertaC19']
 
 # Cell
+import os
+import re
+import gzip
 import json
+import time
+import shutil
+import tempfile
+import hashlib
+from contextlib import nullcontext
 from pathlib import Path
-import requests
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
+from .store import seriesStore
+from .cache import snapshotCache
+from .instrument import metricsRecorder, timed_stage
+from .analysis import wide_to_long
+
+# Cell
+_session = None
+
+def get_session(retries:int=3, pool_maxsize:int=10):
+    '''
+    return the requests session shared by all the scrapers. The session keeps a pool of open
+    connections and retries connection errors and 5xx responses with a backoff. The settings
+    are only used the first time the session is made
+    '''
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_maxsize=pool_maxsize, max_retries=retry)
+        _session = requests.Session()
+        _session.mount('http://', adapter)
+        _session.mount('https://', adapter)
+    return _session
+
+# Cell
+_tag_re = re.compile(rb'<!--|<(/?)([a-zA-Z][a-zA-Z0-9-]*)([^>]*)>')
+_id_re = re.compile(rb'''\bid\s*=\s*["']([^"']*)["']''')
+_rawtext_end_re = {b'script': re.compile(rb'</script\s*>', re.IGNORECASE),
+                   b'style': re.compile(rb'</style\s*>', re.IGNORECASE)}
+
+def extract_section_scripts(content:bytes, section_ids):
+    '''
+    scan the html once and pull out the text of the `script` tags inside each of the html sections
+    with an id in `section_ids`. Doesn't build the html tree so it is much faster and uses less memory
+    than BeautifulSoup on large pages. Stops as soon as all the sections have been read
+
+    Parameters:
+
+        content:bytes
+            the html page, for example `requests.get(url).content`
+        section_ids:[list of str]
+            the ids of the html sections to search
+
+    ----
+    Returns:
+
+        section_scripts:dict
+            the list of script strings for each section id found in the page
+    '''
+    wanted = {section_id.encode() for section_id in section_ids}
+    section_scripts = dict()
+    open_sections = list() # [section id, tag name, how many tags with that name are open]
+    pos = 0
+    while True:
+        match = _tag_re.search(content, pos)
+        if match is None: break
+        pos = match.end()
+        if match.group(0) == b'<!--':
+            end = content.find(b'-->', pos)
+            pos = len(content) if end < 0 else end + 3
+            continue
+        closing, name, attrs = match.group(1), match.group(2).lower(), match.group(3)
+        if closing:
+            for section in open_sections:
+                if section[1] == name: section[2] -= 1
+            open_sections = [section for section in open_sections if section[2] > 0]
+            if not open_sections and len(section_scripts) == len(wanted): break
+            continue
+        if name in _rawtext_end_re:
+            # skip over the contents so any tags written inside javascript or css are ignored
+            end = _rawtext_end_re[name].search(content, pos)
+            end = len(content) if end is None else end.start()
+            if name == b'script':
+                for section in open_sections:
+                    section_scripts[section[0]].append(content[pos:end].decode('utf-8', errors='replace'))
+            pos = end
+            continue
+        if attrs.endswith(b'/'): continue # self closing tag
+        for section in open_sections:
+            if section[1] == name: section[2] += 1
+        id_match = _id_re.search(attrs)
+        if id_match and id_match.group(1) in wanted and id_match.group(1).decode() not in section_scripts:
+            section_id = id_match.group(1).decode()
+            section_scripts[section_id] = list()
+            open_sections.append([section_id, name, 1])
+    return section_scripts
+
+# Cell
+def _decode_widget(script:str):
+    '''
+    utility function that decodes the json in a htmlwidget script tag. Returns `None` if the
+    script isn't json
+    '''
+    try:
+        return json.loads(script)
+    except (TypeError, ValueError):
+        return None
+
+# Cell
+write_modes = ('overwrite', 'append', 'upsert')
+compressions = {None: '', 'gzip': '.gz', 'zstd': '.zst'} # compression: file ending added to csv and json files
+
+def _compress(data:bytes, compression:str=None):
+    '''
+    utility function that compresses the bytes of a file with gzip or zstd (needs `zstandard`
+    installed). Returns `data` as is if `compression` is None
+    '''
+    if compression is None:
+        return data
+    if compression == 'gzip':
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    import zstandard
+    return zstandard.ZstdCompressor().compress(data)
+
+def _atomic_write(flpath:Path, data:bytes):
+    '''
+    utility function that writes to a hidden temporary file next to `flpath` and then renames it
+    to `flpath`, so someone reading the file sees the old or the new file and never half of one
+    '''
+    tmp_path = flpath.with_name(f'.{flpath.name}.tmp')
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, flpath)
+
+def _compact_dataframe(dataframe:pd.DataFrame):
+    '''
+    utility function that gets a dataframe ready for the binary filetypes. Integer columns are
+    stored as int32 when the values fit and the index is stored as a datetime called `date`
+    '''
+    compact = dataframe.copy()
+    int32_info = np.iinfo(np.int32)
+    for column in compact.select_dtypes('integer'):
+        if compact[column].between(int32_info.min, int32_info.max).all():
+            compact[column] = compact[column].astype(np.int32)
+    compact.index = pd.DatetimeIndex(compact.index, name='date')
+    return compact
+
+def _path_size(flpath:Path):
+    '''
+    utility function that returns the size of a file, or of all the files in a folder (parquet)
+    '''
+    if flpath.is_dir():
+        return sum(part.stat().st_size for part in flpath.iterdir())
+    return flpath.stat().st_size if flpath.exists() else 0
+
+def _read_head(flpath:Path, nbytes:int):
+    '''
+    utility function that returns the first `nbytes` of a (maybe gzip or zstd compressed) file
+    '''
+    if flpath.suffix == '.gz':
+        with gzip.open(flpath, 'rb') as flobj:
+            return flobj.read(nbytes)
+    if flpath.suffix == '.zst':
+        import zstandard
+        with zstandard.open(flpath, 'rb') as flobj:
+            return flobj.read(nbytes)
+    with open(flpath, 'rb') as flobj:
+        return flobj.read(nbytes)
+
+def read_dataframe(flpath):
+    '''
+    read a dataframe written by the `albertaC19` scrapers with the dates as the index. The filetype
+    comes from the file ending (csv, json, parquet or feather, csv and json can end in `.gz` or `.zst`
+    when compressed). feather files are memory mapped and parquet can be a single file or a folder of part files.
+    json with repeated dates (the long layout) is written and read with `orient='split'`
+    '''
+    flpath = Path(flpath)
+    suffix = flpath.suffix
+    if suffix in ('.gz', '.zst'):
+        suffix = Path(flpath.stem).suffix
+    if suffix == '.csv':
+        return pd.read_csv(flpath, index_col=0, parse_dates=True)
+    if suffix == '.json':
+        orient = 'split' if _read_head(flpath, 12) == b'{"columns":[' else 'columns'
+        return pd.read_json(flpath, orient=orient)
+    if suffix == '.parquet':
+        return pd.read_parquet(flpath).sort_index()
+    if suffix == '.feather':
+        from pyarrow import feather
+        return feather.read_table(flpath, memory_map=True).to_pandas().set_index('date')
+    raise ValueError(f'unknown filetype {flpath.suffix}')
+
+# Cell
+def _parse_dates(date_strings, date_cache:dict):
+    '''
+    utility function used to convert date strings to int64 nanoseconds. Only strings that are
+    not already in `date_cache` are parsed and they are parsed in a single call
+    '''
+    new_dates = [date for date in set(date_strings) if date not in date_cache]
+    if new_dates:
+        date_cache.update(zip(new_dates, pd.to_datetime(new_dates).asi8.tolist()))
+    return np.fromiter((date_cache[date] for date in date_strings), dtype=np.int64, count=len(date_strings))
+
+def _smallest_int_dtype(low, high, downcast:bool=False):
+    '''
+    utility function that returns int32, or int64 if the values `low` to `high` don't fit. With
+    `downcast` int8 and int16 are also used
+    '''
+    for int_type in ((np.int8, np.int16, np.int32) if downcast else (np.int32,)):
+        int_info = np.iinfo(int_type)
+        if int_info.min <= low and high <= int_info.max:
+            return np.dtype(int_type)
+    return np.dtype(np.int64)
+
+def traces_to_frame(traces, columns, date_cache:dict=None, dtype=None, align_on=0, date_index:bool=True,
+                    downcast:bool=False):
+    '''build one dataframe from a list of plotly traces in a single pass
+
+    Parameters:
+
+        traces:list
+            plotly trace dicts with an `x` list of date strings (or labels) and a `y` list of values
+        columns:list
+            the column name for each trace
+        date_cache:dict
+            date string to int64 nanosecond lookup shared between calls so each date is only parsed once
+        dtype:
+            the dtype of the values. Missing values are filled with 0. If None uses int32 (half the
+            memory of int64) unless a value doesn't fit
+        align_on:int
+            the trace whose dates are used as the index. `None` uses the sorted dates of all the traces
+        date_index:bool
+            if False the `x` values are used as labels, for example the age groups of a bar chart.
+            With `align_on=None` the labels are kept in the order they are first seen
+        downcast:bool
+            if True and `dtype` is None int8 and int16 are also used when the values fit. Adding or
+            multiplying these small columns can overflow without an error, so only use it for storage
+    ----
+    Returns:
+        dataframe with a DatetimeIndex (or an Index of labels) and one column per trace
+    '''
+    if len(traces) != len(columns):
+        raise ValueError(f"got {len(traces)} traces but {len(columns)} column names")
+    if date_cache is None:
+        date_cache = dict()
+    if date_index:
+        trace_dates = [_parse_dates(trace['x'], date_cache) for trace in traces]
+    else:
+        trace_dates = [pd.Index(trace['x'], dtype=object) for trace in traces]
+    if align_on is None:
+        index = pd.Index(np.concatenate(trace_dates) if trace_dates else []).unique()
+        if date_index:
+            index = index.sort_values()
+    else:
+        index = pd.Index(trace_dates[align_on])
+
+    all_values = list()
+    for trace in traces:
+        trace_values = np.asarray(trace['y'], dtype=float)
+        trace_values[np.isnan(trace_values)] = 0
+        all_values.append(trace_values)
+    if dtype is None:
+        # the missing values are 0 so 0 always has to fit
+        dtype = _smallest_int_dtype(min([0] + [trace_values.min() for trace_values in all_values if len(trace_values)]),
+                                    max([0] + [trace_values.max() for trace_values in all_values if len(trace_values)]),
+                                    downcast)
+
+    values = np.zeros((len(index), len(traces)), dtype=dtype)
+    for col, (trace_values, positions) in enumerate(zip(all_values, trace_dates)):
+        rows = index.get_indexer(positions)
+        found = rows >= 0
+        values[rows[found], col] = trace_values[found]
+
+    index = pd.DatetimeIndex(index) if date_index else index
+    return pd.DataFrame(values, index=index, columns=list(columns))
+
+# Cell
+widget_specs = {
+    'alberta_cumulative_cases': {'section': 'totals', 'figure': 'Cases', 'traces': {'Cases': 'cum_cases'}},
+    'alberta_daily_cases': {'section': 'totals', 'figure': 'Confirmed',
+                            'traces': {'Confirmed': 'Confirmed_count', 'Probable': 'Probable_count'}},
+    'alberta_case_status': {'section': 'totals', 'figure': 'Active',
+                            'traces': {'Active': 'Active_cum', 'Died': 'Died_cum', 'Recovered': 'Recovered_cum'}},
+    'alberta_region_cumulative': {'section': 'regions', 'figure': 0},
+    'alberta_testing_counts': {'section': 'testing', 'figure': 0, 'traces': {'Tests': 'test_count'}},
+}
+
+_spec_keys = {'section', 'figure', 'traces', 'dtype', 'align', 'index'}
+
+def _widget_traces(widget):
+    '''
+    utility function that returns the plotly traces of a decoded widget, or None for widgets that
+    aren't plotly figures (like a leaflet map) or couldn't be decoded
+    '''
+    if not isinstance(widget, dict) or not isinstance(widget.get('x'), dict):
+        return None
+    traces = widget['x'].get('data')
+    return traces if isinstance(traces, list) else None
+
+class widgetExtractor():
+    def __init__(self, specs:dict, html_ids:dict=None):
+        '''pull dataframes out of the decoded plotly widgets using a dictionary of specs instead
+        of a hand written cleaner for each series. The specs are checked once when the extractor is
+        made and every series is built from the same decoded widgets, see `albertaC19.index_widgets`
+
+        Parameters:
+
+            specs:dict
+                series name: spec. Each spec is a dictionary with the keys
+                    section: the `html_ids` key (`totals`, `regions`, `testing`) or the html id of the section
+                    figure: the position of the widget in the section or the name of a trace in the widget.
+                            Using a trace name keeps working if the figures get moved around. Default 0
+                    traces: trace name: column name. `None` keeps every trace using the trace names. Default None
+                    dtype: the dtype of the values. Default None, int32 or int64 if the values don't fit
+                    align: `first` uses the dates of the first trace, `union` the dates of all the traces.
+                           Default `first`
+                    index: `date` or `label` for figures that aren't by date (age groups). Default `date`
+            html_ids:dict
+                the `html_ids` used to look up the section keys
+        '''
+        html_ids = html_ids if html_ids is not None else dict()
+        self.specs = dict()
+        for name, spec in specs.items():
+            unknown_keys = set(spec).difference(_spec_keys)
+            if unknown_keys:
+                raise ValueError(f"unknown keys {sorted(unknown_keys)} in the spec for `{name}`")
+            if 'section' not in spec:
+                raise ValueError(f"the spec for `{name}` needs a `section`")
+            figure = spec.get('figure', 0)
+            if not isinstance(figure, (int, str)):
+                raise ValueError(f"`figure` for `{name}` must be a position or a trace name")
+            traces = spec.get('traces')
+            if traces is not None and not isinstance(traces, dict):
+                raise ValueError(f"`traces` for `{name}` must be a dictionary of trace name: column name")
+            align = spec.get('align', 'first')
+            if align not in ('first', 'union'):
+                raise ValueError(f"`align` for `{name}` must be `first` or `union`")
+            index = spec.get('index', 'date')
+            if index not in ('date', 'label'):
+                raise ValueError(f"`index` for `{name}` must be `date` or `label`")
+            self.specs[name] = {'section': html_ids.get(spec['section'], spec['section']), 'figure': figure,
+                                'traces': traces, 'dtype': spec.get('dtype'),
+                                'align_on': 0 if align == 'first' else None, 'date_index': index == 'date'}
+        self.section_ids = {spec['section'] for spec in self.specs.values()}
+
+    def _find_figure(self, name:str, section_widgets:list):
+        '''
+        utility function that returns the widget picked by the `figure` of the spec `name`
+        '''
+        figure = self.specs[name]['figure']
+        if isinstance(figure, int):
+            if figure >= len(section_widgets) or _widget_traces(section_widgets[figure]) is None:
+                raise Warning(f"unable to find figure {figure} for `{name}`. Website likely changed. Check the results")
+            return section_widgets[figure]
+        for widget in section_widgets:
+            if any(trace.get('name') == figure for trace in _widget_traces(widget) or []):
+                return widget
+        raise Warning(f"unable to find a figure with the trace `{figure}` for `{name}`. Website likely changed. Check the results")
+
+    def extract(self, widgets:dict, names=None, date_cache:dict=None):
+        '''build the dataframes for the specs
+
+        Parameters:
+
+            widgets:dict
+                section id: list of decoded widgets (`albertaC19.widgets`)
+            names:list
+                the series to build. `None` builds all of them
+            date_cache:dict
+                shared date lookup passed to `traces_to_frame`
+        ----
+        Returns:
+            dictionary of series name: dataframe
+        '''
+        if date_cache is None:
+            date_cache = dict()
+        names = list(self.specs) if names is None else names
+        results = dict()
+        for name in names:
+            spec = self.specs[name]
+            if spec['section'] not in widgets:
+                raise Warning(f"unable to find the html id `{spec['section']}` for `{name}`. Website likely changed. Check print_html_class_ids")
+            widget = self._find_figure(name, widgets[spec['section']])
+            widget_traces = {trace.get('name'): trace for trace in _widget_traces(widget)}
+            if spec['traces'] is None:
+                trace_names = [trace_name for trace_name in widget_traces if trace_name is not None]
+                columns = trace_names
+            else:
+                missing_traces = [trace_name for trace_name in spec['traces'] if trace_name not in widget_traces]
+                if missing_traces:
+                    raise Warning(f"unable to find the traces {missing_traces} for `{name}`. Website likely changed. Check the results")
+                trace_names = list(spec['traces'])
+                columns = list(spec['traces'].values())
+            results[name] = traces_to_frame([widget_traces[trace_name] for trace_name in trace_names], columns,
+                                            date_cache, dtype=spec['dtype'], align_on=spec['align_on'],
+                                            date_index=spec['date_index'])
+        return results
 
 # Cell
 class albertaC19():
     def __init__(self, covid_url:str='https://covid19stats.alberta.ca/', outputfolder:str='data',
-                 html_update_ids:dict=None, totals_update_fig_order:dict=None):
+                 html_update_ids:dict=None, totals_update_fig_order:dict=None,
+                 session:'requests.Session'=None, timeout:float=30, extractor:str='stream',
+                 decode_workers:int=None, write_mode:str='overwrite', cache:snapshotCache=None,
+                 widget_update_specs:dict=None, metrics:metricsRecorder=None, compression:str=None,
+                 write_workers:int=None):
         '''
         using requests and BeautfulSoup4 scrape updated covid data from the ablerta website
-        save the outputs into a outputfolder
+        save the outputs into a outputfolder. The page isn't downloaded until it is needed
+        (or `fetch` is called)
 
         Parameters:
 
@@ -27,19 +429,274 @@ class albertaC19():
                 if the alberta covid html changes the html id where the specified data is stored you
                 can update to the new id here. This is used in the scrapers. current keys are
                 `totals`, `regions`, `testing`
+            session:requests.Session
+                the session used to download the page. If None will use the shared session
+                from `get_session` so connections get reused between scrapers
+            timeout:float
+                seconds to wait for the website before giving up
+            extractor:str
+                how to find the data in the html. `stream` scans the page once for the script tags in the
+                `html_ids` sections without building the whole html tree (see `extract_section_scripts`)
+                and falls back to BeautifulSoup if a section is missing. `soup` always uses BeautifulSoup
+            decode_workers:int
+                if set will decode the json in the script tags using a thread pool with this many workers
+            write_mode:str
+                how the scrapers write to files that already exist. `overwrite` replaces the file,
+                `append` only writes the dates after the last date in the file and `upsert` also
+                rewrites the file if any of the old values changed
+            cache:snapshotCache
+                if set each new page and its decoded widgets get saved in the cache. See `from_cache`
+            widget_update_specs:dict
+                extra or replacement series specs for `scrape_widgets`, added to `widget_specs`.
+                See `widgetExtractor` for the spec keys
+            metrics:metricsRecorder
+                if set records the time, bytes and rows of each stage (download, extract, decode, clean
+                and write). See `metricsRecorder`
+            compression:str
+                `gzip` or `zstd` compresses the csv and json files (adding `.gz` or `.zst` to the file
+                ending) and is used as the parquet compression. zstd needs `zstandard` installed
+            write_workers:int
+                the filetypes of a dataframe are written at the same time by a thread pool with this
+                many threads. Defaults to one thread per filetype, use 1 to write one after the other
         '''
+        if compression not in compressions:
+            raise ValueError(f'compression must be one of {list(compressions)}')
         self.covid_url = covid_url
         self.outputfolder = Path(outputfolder)
         if not self.outputfolder.is_dir(): self.outputfolder.mkdir()
 
-        self.page = requests.get(self.covid_url)
-        self.soup = BeautifulSoup(self.page.content, 'html.parser')
+        self._session = session
+        self.timeout = timeout
+        self.page = None
+        self.content = None
+        self.content_hash = None
+        self.cache = cache
+        self.scrape_timestamp = None
+        self.store_path = self.outputfolder.joinpath('alberta_covid.sqlite')
+        self._store = None
+        self.extractor = extractor
+        self.decode_workers = decode_workers
+        self.write_mode = write_mode
+        self.metrics = metrics
+        self._soup = None
+        self.widgets = None
+        self._date_cache = dict()
+        self.fetch_stats = {'requests': 0, 'not_modified': 0, 'unchanged': 0,
+                            'bytes_fetched': 0, 'bytes_skipped': 0, 'writes_skipped': 0}
+        self._written = dict() # output filename: what it was last written from, see `_write_key`
+        self.compression = compression
+        self.write_workers = write_workers
+        self.write_stats = dict()
         self.html_ids = {'totals':'cases', 'regions':'geospatial', 'testing': 'laboratory-testing'}
         if html_update_ids:
             self.html_ids.update(html_update_ids)
         self.totals_figure_order = {'cum_cases':0, 'daily_cases':2, 'case_status':0}
         if totals_update_fig_order:
             self.totals_figure_order.update(totals_update_fig_order)
+        self.widget_specs = dict(widget_specs)
+        if widget_update_specs:
+            self.widget_specs.update(widget_update_specs)
+        self._widget_extractor = None
+
+    def fetch(self, force:bool=False):
+        '''
+        download the covid page. Sends the `ETag` and `Last-Modified` of the last download so the
+        website can answer with `304 Not Modified`. If the page hasn't changed (either a 304 or the
+        same content hash) the old page and soup are kept so nothing needs to be parsed again, and
+        the scrapers don't clean or write a series they already wrote from this page
+
+        Parameters:
+
+            force:bool
+                if True will always download the full page
+
+        ----
+        Returns:
+
+            changed:bool
+                True if new page content was downloaded, False if the page hasn't changed
+        '''
+        headers = dict()
+        if self.page is not None and not force:
+            if self.page.headers.get('ETag'):
+                headers['If-None-Match'] = self.page.headers['ETag']
+            if self.page.headers.get('Last-Modified'):
+                headers['If-Modified-Since'] = self.page.headers['Last-Modified']
+
+        with timed_stage(self.metrics, 'fetch') as record:
+            page = self.session.get(self.covid_url, headers=headers, timeout=self.timeout)
+            record['bytes_in'] = len(page.content)
+        self.fetch_stats['requests'] += 1
+        if page.status_code == 304:
+            self.fetch_stats['not_modified'] += 1
+            self.fetch_stats['bytes_skipped'] += len(self.content)
+            return False
+        page.raise_for_status()
+
+        self.fetch_stats['bytes_fetched'] += len(page.content)
+        self.page = page # keep the newest headers for the next conditional request
+        changed = self.set_content(page.content)
+        if not changed:
+            self.fetch_stats['unchanged'] += 1
+        return changed
+
+    def set_content(self, content:bytes, scrape_timestamp=None):
+        '''
+        use `content` as the covid page. Nothing gets reset if it is the same as the current page
+
+        Parameters:
+
+            content:bytes
+                the html of the covid page
+            scrape_timestamp:[str or pd.Timestamp]
+                when the page was downloaded. If None will use the current UTC time
+
+        ----
+        Returns:
+
+            changed:bool
+                True if the content is different from the current page
+        '''
+        content_hash = hashlib.sha256(content).hexdigest()
+        if content_hash == self.content_hash:
+            return False
+        self.content = content
+        self.content_hash = content_hash
+        self.scrape_timestamp = pd.Timestamp.utcnow() if scrape_timestamp is None else pd.Timestamp(scrape_timestamp)
+        self._soup = None
+        self.widgets = None
+        if self.cache is not None:
+            self.cache.put_page(content)
+        return True
+
+    @classmethod
+    def from_file(cls, flpath, **kwargs):
+        '''
+        make a scraper from a saved copy of the covid page instead of downloading it. The time the
+        file was last modified is used as the scrape timestamp. `kwargs` are passed to `albertaC19`
+        '''
+        flpath = Path(flpath)
+        scraper = cls(**kwargs)
+        scraper.set_content(flpath.read_bytes(), pd.Timestamp(flpath.stat().st_mtime, unit='s', tz='UTC'))
+        return scraper
+
+    @classmethod
+    def from_cache(cls, content_hash:str, cache:snapshotCache, **kwargs):
+        '''
+        make a scraper from a page saved in a `snapshotCache`. If the decoded widgets were also saved
+        the html doesn't need to be parsed again. `kwargs` are passed to `albertaC19`
+        '''
+        scraper = cls(cache=cache, **kwargs)
+        scraper.set_content(cache.get_page(content_hash))
+        widgets = cache.get_widgets(content_hash)
+        if widgets is not None and scraper._section_ids().issubset(widgets):
+            scraper.widgets = widgets
+        return scraper
+
+    @property
+    def session(self):
+        '''
+        the requests session used to download the page. Uses the shared session from `get_session`
+        if one wasn't given
+        '''
+        if self._session is None:
+            self._session = get_session()
+        return self._session
+
+    @property
+    def soup(self):
+        '''
+        the BeautifulSoup of the covid page. Downloads the page the first time it is used
+        '''
+        if self._soup is None:
+            from bs4 import BeautifulSoup
+            if self.content is None:
+                self.fetch()
+            with timed_stage(self.metrics, 'soup') as record:
+                record['bytes_in'] = len(self.content)
+                self._soup = BeautifulSoup(self.content, 'html.parser')
+        return self._soup
+
+    def index_widgets(self):
+        '''
+        find the `script` tags for all the `html_ids` and `widget_specs` sections in one pass over the page and decode
+        their json once. The decoded widgets are kept in `self.widgets` (section id: list of widgets)
+        until the page or the `html_ids` change, so all the scrapers share the same pass
+
+        ----
+        Returns:
+
+            widgets:dict
+                the list of decoded widgets for each section found in the page. Scripts that aren't
+                json are left as `None`
+        '''
+        section_ids = self._section_ids()
+        section_scripts = dict()
+        if self.content is None:
+            self.fetch()
+        with timed_stage(self.metrics, 'extract') as record:
+            record['bytes_in'] = len(self.content)
+            if self.extractor == 'stream':
+                section_scripts = {section_id: scripts for section_id, scripts
+                                   in extract_section_scripts(self.content, section_ids).items() if scripts}
+            missing_ids = section_ids.difference(section_scripts)
+            if missing_ids:
+                for section in self.soup.find_all(id=list(missing_ids)):
+                    section_scripts.setdefault(section['id'], [script.string for script in section.find_all('script')])
+            all_scripts = [script for scripts in section_scripts.values() for script in scripts]
+            record['rows'] = len(all_scripts)
+
+        with timed_stage(self.metrics, 'decode') as record:
+            if self.metrics is not None:
+                record['bytes_in'] = sum(len(script) for script in all_scripts if script)
+            if self.decode_workers:
+                with ThreadPoolExecutor(max_workers=self.decode_workers) as pool:
+                    all_widgets = iter(list(pool.map(_decode_widget, all_scripts)))
+            else:
+                all_widgets = map(_decode_widget, all_scripts)
+            self.widgets = {section_id: [next(all_widgets) for _ in scripts]
+                            for section_id, scripts in section_scripts.items()}
+            record['rows'] = len(all_scripts)
+        if self.cache is not None:
+            self.cache.put_widgets(self.content_hash, self.widgets)
+        return self.widgets
+
+    @property
+    def store(self):
+        '''
+        the `seriesStore` used when writing the `sqlite` filetype. Opens `self.store_path` the
+        first time it is used
+        '''
+        if self._store is None:
+            self._store = seriesStore(self.store_path)
+        return self._store
+
+    @property
+    def widget_extractor(self):
+        '''
+        the `widgetExtractor` for `self.widget_specs`. Made the first time it is used
+        '''
+        if self._widget_extractor is None:
+            self._widget_extractor = widgetExtractor(self.widget_specs, self.html_ids)
+        return self._widget_extractor
+
+    def _section_ids(self):
+        '''
+        utility function that returns all the html section ids used by the scrapers and the widget specs
+        '''
+        return set(self.html_ids.values()).union(self.widget_extractor.section_ids)
+
+    def _section_widgets(self, scraper_key:str):
+        '''
+        utility function that returns the decoded widgets in the html section used by the
+        scraper `scraper_key` (`totals`, `regions` or `testing`)
+        '''
+        if self.widgets is None:
+            self.index_widgets()
+        section_id = self.html_ids[scraper_key]
+        if section_id not in self.widgets:
+            raise Warning(f"unable to find the html id `{section_id}`. Website likely changed. Check print_html_class_ids")
+        return self.widgets[section_id]
 
     def print_html_class_ids(self, html_class_attr:str='level2', print_self:bool=True):
         '''
@@ -76,6 +733,18 @@ class albertaC19():
         '''
         if html_update_ids:
             self.html_ids.update(html_update_ids)
+            self.widgets = None
+            self._widget_extractor = None
+
+    def update_widget_specs(self, widget_update_specs:dict=None):
+        '''
+        add or replace the series specs used by `scrape_widgets`. See `widgetExtractor` for the spec keys
+        '''
+        if widget_update_specs:
+            self.widget_specs.update(widget_update_specs)
+            self._widget_extractor = None
+            if self.widgets is not None and not self._section_ids().issubset(self.widgets):
+                self.widgets = None
 
     def update_fig_order(self, totals_update_fig_order:dict=None):
         '''
@@ -90,37 +759,18 @@ class albertaC19():
         '''
         utility function used to clean up the cumulative data
         '''
-        dates = ab_cumulative_dict['x']['data'][0]['x']
-        cum_cases = ab_cumulative_dict['x']['data'][0]['y']
-        # Convert to DataFrame
-        df_ab_cumulative = pd.DataFrame(data=cum_cases,
-                                        index=dates,
-                                        columns=['cum_cases'])
-        # Clean up formatting of df
-        df_ab_cumulative.index = pd.to_datetime(df_ab_cumulative.index)
-
-        return df_ab_cumulative
+        return traces_to_frame(ab_cumulative_dict['x']['data'][:1], ['cum_cases'], self._date_cache)
 
     def _clean_daily_case_data(self, ab_daily_cases:dict):
         '''
         utility function used to clean up the daily case data
         '''
-        daily_data = dict()
-        for data in ab_daily_cases['x']['data']:
-            daily_data[data['name']] = {'date': data['x'], '{0}_count'.format(data['name']): data['y']}
+        daily_data = {data['name']: data for data in ab_daily_cases['x']['data']}
         if len(daily_data) != 2:
             raise Warning("expecting only 2 daily case categories. Website likely changed. Check the results")
-        df_confirmed = pd.DataFrame(data=daily_data['Confirmed']['Confirmed_count'],
-                                    index=daily_data['Confirmed']['date'],
-                                    columns=['Confirmed_count'])
-        df_confirmed.index = pd.to_datetime(df_confirmed.index)
-        df_probable = pd.DataFrame(data=daily_data['Probable']['Probable_count'],
-                                   index=daily_data['Probable']['date'],
-                                   columns=['Probable_count'])
-        df_probable.index = pd.to_datetime(df_probable.index)
-
-        df_daily_cases = df_confirmed.join(df_probable)
-        df_daily_cases['Daily_count'] = df_daily_cases.sum(axis=1)
+        df_daily_cases = traces_to_frame([daily_data['Confirmed'], daily_data['Probable']],
+                                         ['Confirmed_count', 'Probable_count'], self._date_cache)
+        df_daily_cases['Daily_count'] = df_daily_cases['Confirmed_count'] + df_daily_cases['Probable_count']
 
         return df_daily_cases
 
@@ -128,29 +778,12 @@ class albertaC19():
         '''
         utility function used to clean up the case status data
         '''
-        status_data = dict()
-        for data in ab_case_status['x']['data']:
-            status_data[data['name']] = {'date': data['x'], '{0}_cum'.format(data['name']): data['y']}
-        try:
-            if len(status_data) != 4: # totals and case status were combined
-                print("WARNING: expecting only 3 status case categories. Website likely changed. Check the results")
-        except:
-            pass
-
-        df_active = pd.DataFrame(data=status_data['Active']['Active_cum'],
-                                 index=status_data['Active']['date'],
-                                 columns=['Active_cum'])
-        df_active.index = pd.to_datetime(df_active.index)
-        df_died = pd.DataFrame(data=status_data['Died']['Died_cum'],
-                               index=status_data['Died']['date'],
-                               columns=['Died_cum'])
-        df_died.index = pd.to_datetime(df_died.index)
-        df_recovered = pd.DataFrame(data=status_data['Recovered']['Recovered_cum'],
-                                    index=status_data['Recovered']['date'],
-                                    columns=['Recovered_cum'])
-        df_recovered.index = pd.to_datetime(df_recovered.index)
-
-        df_case_status = df_active.join([df_died, df_recovered])
+        status_data = {data['name']: data for data in ab_case_status['x']['data']}
+        if len(status_data) != 4: # totals and case status were combined
+            print("WARNING: expecting only 3 status case categories. Website likely changed. Check the results")
+
+        df_case_status = traces_to_frame([status_data['Active'], status_data['Died'], status_data['Recovered']],
+                                         ['Active_cum', 'Died_cum', 'Recovered_cum'], self._date_cache)
 
         return df_case_status
 
@@ -171,34 +804,38 @@ class albertaC19():
             return_dataframe:bool
                 will return either the dataframes or a true/false on write success
         '''
-        results = self.soup.find(id=self.html_ids['totals'])
-        totals_results = results.find_all('script')
+        totals_results = self._section_widgets('totals')
         fig_order = self.totals_figure_order.copy()
         if update_figure_order:
             fig_order.update(update_figure_order)
+        write_key = self._write_key(fltypes, fig_order)
+        if not return_dataframe and self._unchanged_write(output_filename, write_key):
+            return False
 
-        # Scrape the data
-        ab_cumulative = json.loads(totals_results[fig_order['cum_cases']].string)
-        ab_daily_cases = json.loads(totals_results[fig_order['daily_cases']].string)
-        ab_case_status = json.loads(totals_results[fig_order['case_status']].string)
+        with timed_stage(self.metrics, 'clean', series=output_filename) as record:
+            # Scrape the data
+            ab_cumulative = totals_results[fig_order['cum_cases']]
+            ab_daily_cases = totals_results[fig_order['daily_cases']]
+            ab_case_status = totals_results[fig_order['case_status']]
 
-        df_ab_cumulative = self._clean_cumulative_data(ab_cumulative)
-        df_ab_daily_cases = self._clean_daily_case_data(ab_daily_cases)
-        df_ab_case_status = self._clean_case_status_data(ab_case_status)
+            df_ab_cumulative = self._clean_cumulative_data(ab_cumulative)
+            df_ab_daily_cases = self._clean_daily_case_data(ab_daily_cases)
+            df_ab_case_status = self._clean_case_status_data(ab_case_status)
 
-        df_ab_all = df_ab_cumulative.join([df_ab_daily_cases, df_ab_case_status])
-        # clean up df formatting
-        df_ab_all.fillna(0, inplace=True)
-        df_ab_all = df_ab_all.astype(int)
+            # line everything up with the cumulative dates. Dates missing from the other figures are 0
+            dates = df_ab_cumulative.index
+            df_ab_all = pd.concat([df_ab_cumulative, df_ab_daily_cases.reindex(dates, fill_value=0),
+                                   df_ab_case_status.reindex(dates, fill_value=0)], axis=1)
+            record['rows'] = len(df_ab_all)
 
         # Write out the data. If fltypes = None the function will return False
-        write_success = self._write_dataframe(df_ab_all, output_filename, fltypes)
+        write_success = self._write_scraped(df_ab_all, output_filename, fltypes, write_key)
         if return_dataframe:
             return df_ab_all
         return write_success
 
     def scrape_albertaRegions(self, output_filename:str='alberta_region_data', fltypes=('csv', 'json'),
-                              return_dataframe:bool=False):
+                              return_dataframe:bool=False, layout:str='wide'):
         '''scrape the total case counts in alberta by region and save the data
         to the output folder
 
@@ -210,37 +847,39 @@ class albertaC19():
                 will save out either csv, json or both filetypes
             return_dataframe:bool
                 will return either the dataframes or a true/false on write success
+            layout:str
+                `wide` has a `<zone>_cumulative` column for each zone. `long` has a row for each zone and
+                date with a categorical `region` column and the counts in the smallest integer type that
+                fits (see `wide_to_long`). The long layout can't be upserted or written to `sqlite`
         '''
-        results = self.soup.find(id=self.html_ids['regions'])
+        if layout not in ('wide', 'long'):
+            raise ValueError(f"layout must be `wide` or `long` not `{layout}`")
+        if layout == 'long' and fltypes and ('sqlite' in fltypes or self.write_mode == 'upsert'):
+            raise ValueError("the long layout can't be upserted or written to sqlite, use the wide layout")
+        region_results = self._section_widgets('regions')
+        write_key = self._write_key(fltypes, layout)
+        if not return_dataframe and self._unchanged_write(output_filename, write_key):
+            return False
+        results_as_dict = region_results[0]['x']
 
-        region_results = results.find_all('script')
-        results_as_dict = json.loads(region_results[0].string)['x']
+        with timed_stage(self.metrics, 'clean', series=output_filename) as record:
+            region_data_dict = {data['name']: data for data in results_as_dict['data']}
+            columns = list()
+            for key in region_data_dict.keys():
+                if 'Zone' in key:
+                    zone = key.strip(' Zone')
+                else:
+                    zone = key
+                columns.append(f'{zone}_cumulative')
 
-        zone_len = len(results_as_dict['data'])
-        region_data_dict = dict()
-        for idx in range (zone_len):
-            zone_name = results_as_dict['data'][idx]['name']
-            region_data_dict[zone_name] = {'date':results_as_dict['data'][idx]['x'],
-                                           'cumulative':results_as_dict['data'][idx]['y']}
-
-        list_ab_regions = list()
-        for idx, key in enumerate(region_data_dict.keys()):
-            if 'Zone' in key:
-                zone = key.strip(' Zone')
-            else:
-                zone = key
-            column = f'{zone}_cumulative'
-            list_ab_regions.append(pd.DataFrame(data=region_data_dict[key]['cumulative'],
-                                                index=region_data_dict[key]['date'],
-                                                columns=[column]))
-
-        df_ab_regions = list_ab_regions[0].join(list_ab_regions[1:])
-        df_ab_regions.index = pd.to_datetime(df_ab_regions.index)
-        df_ab_regions.fillna(0, inplace=True)
-        df_ab_regions = df_ab_regions.astype(int)
+            # the dates are lined up with the first zone, missing dates in the other zones are 0
+            df_ab_regions = traces_to_frame(list(region_data_dict.values()), columns, self._date_cache)
+            if layout == 'long':
+                df_ab_regions = wide_to_long(df_ab_regions)
+            record['rows'] = len(df_ab_regions)
 
         # Write out the data. If fltypes = None the function will return False
-        write_success = self._write_dataframe(df_ab_regions, output_filename, fltypes)
+        write_success = self._write_scraped(df_ab_regions, output_filename, fltypes, write_key)
         if return_dataframe:
             return df_ab_regions
         return write_success
@@ -259,28 +898,60 @@ class albertaC19():
             return_dataframe:bool
                 will return either the dataframes or a true/false on write success
         '''
-        results = self.soup.find(id=self.html_ids['testing'])
-        testing_results = results.find_all('script')
+        testing_results = self._section_widgets('testing')
         if len(testing_results) != 1:
             raise Warning("expecting only 1 test case categories. Website likely changed. Check the results")
+        write_key = self._write_key(fltypes)
+        if not return_dataframe and self._unchanged_write(output_filename, write_key):
+            return False
         # Scrape the data
-        tests_as_dict = json.loads(testing_results[0].string)['x']
-        dates = tests_as_dict['data'][0]['x']
-        test_count = tests_as_dict['data'][0]['y']
-        # Convert to DataFrame
-        df_ab_tests = pd.DataFrame(data=test_count,
-                                        index=dates,
-                                        columns=['test_count'])
-        df_ab_tests.index = pd.to_datetime(df_ab_tests.index)
-        df_ab_tests = df_ab_tests.astype(int)
+        with timed_stage(self.metrics, 'clean', series=output_filename) as record:
+            tests_as_dict = testing_results[0]['x']
+            df_ab_tests = traces_to_frame(tests_as_dict['data'][:1], ['test_count'], self._date_cache)
+            record['rows'] = len(df_ab_tests)
 
         # Write out the data. If fltypes = None the function will return False
-        write_success = self._write_dataframe(df_ab_tests, output_filename, fltypes)
+        write_success = self._write_scraped(df_ab_tests, output_filename, fltypes, write_key)
         if return_dataframe:
             return df_ab_tests
         return write_success
 
-    def _write_dataframe(self, dataframe:pd.DataFrame, output_filename:str, fltypes):
+    def _write_key(self, fltypes, *scrape_args):
+        '''
+        utility function that returns everything a scraped file depends on: the page, the filetypes,
+        the write settings and the arguments of the scraper. None if nothing gets written
+        '''
+        if not fltypes:
+            return None
+        fltypes = (fltypes,) if isinstance(fltypes, str) else tuple(fltypes)
+        return (self.content_hash, tuple(sorted(fltypes)), self.write_mode, self.compression,
+                repr(self.html_ids), repr(scrape_args))
+
+    def _unchanged_write(self, output_filename:str, write_key):
+        '''
+        utility function that checks if `output_filename` was already written with `write_key` (the same
+        page and settings) and the files are still there, so writing it again would change nothing
+        '''
+        if write_key is None or self._written.get(output_filename) != write_key:
+            return False
+        if not all(self._output_path(output_filename, fltype).exists() for fltype in write_key[1] if fltype != 'sqlite'):
+            return False
+        self.fetch_stats['writes_skipped'] += 1
+        return True
+
+    def _write_scraped(self, dataframe:pd.DataFrame, output_filename:str, fltypes, write_key):
+        '''
+        utility function used by the scrapers to write a series unless it was already written from the
+        same page with the same settings. Returns False when the write is skipped
+        '''
+        if self._unchanged_write(output_filename, write_key):
+            return False
+        write_success = self._write_dataframe(dataframe, output_filename, fltypes)
+        if write_key is not None:
+            self._written[output_filename] = write_key
+        return write_success
+
+    def _write_dataframe(self, dataframe:pd.DataFrame, output_filename:str, fltypes, write_mode:str=None):
         ''''
         utility function to write the dataframe scraped. This way we can easily add different
         write functions to all the scraping functions.
@@ -292,29 +963,193 @@ class albertaC19():
             output_filename:str
                 filename without the file ending
             fltypes:[list or str]
-                will save out either csv, json or both filetypes
+                will save out any of the csv, json, parquet or feather filetypes. parquet and feather
+                need `pyarrow` installed. `sqlite` adds the data to the `seriesStore` in `self.store_path`
+            write_mode:str
+                `overwrite`, `append` or `upsert`. If None will use `self.write_mode`. See `write_modes`
+
+        The filetypes are written at the same time (see `write_workers`) and each file is written to a
+        temporary file first and then renamed, so a half written file is never seen (see `_write_fltype`). The bytes written
+        and seconds taken for each filetype are saved in `self.write_stats[output_filename]`
 
         ----
         Returns:
 
             write_success:bool
                 whether it wrote anything out or not. If `None` for fltypes is passed
-                will return `False`
+                (or there is nothing new to append) will return `False`
 
         '''
+        write_mode = write_mode or self.write_mode
+        if write_mode not in write_modes:
+            raise ValueError(f'write_mode must be one of {write_modes}')
         write_success = False
         # Write out the data
         if fltypes:
-            if 'json' in fltypes:
-                flpath = self.outputfolder.joinpath(output_filename).with_suffix('.json')
-                dataframe.to_json(flpath)
-                write_success = True
-            if 'csv' in fltypes:
-                flpath = self.outputfolder.joinpath(output_filename).with_suffix('.csv')
-                dataframe.to_csv(flpath)
-                write_success = True
+            file_types = [fltype for fltype in ('json', 'csv', 'parquet', 'feather') if fltype in fltypes]
+            workers = min(self.write_workers or len(file_types), len(file_types))
+            if self.metrics is not None and self.metrics.track_memory:
+                workers = 1 # tracemalloc can't tell the threads apart
+            write = lambda fltype: self._write_file(dataframe, output_filename, fltype, write_mode)
+            if workers > 1:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(write, file_types))
+            else:
+                results = [write(fltype) for fltype in file_types]
+            if file_types:
+                self.write_stats[output_filename] = {fltype: {'bytes': nbytes or 0, 'seconds': seconds}
+                                                     for fltype, (nbytes, seconds) in zip(file_types, results)}
+            write_success = any(nbytes is not None for nbytes, _ in results)
+            if 'sqlite' in fltypes:
+                with timed_stage(self.metrics, 'write', series=output_filename, fltype='sqlite') as record:
+                    inserted = self.store.insert(output_filename, dataframe, self.scrape_timestamp)
+                    record['rows'] = inserted
+                    if inserted:
+                        write_success = True
         return write_success
 
+    def _output_path(self, output_filename:str, fltype:str):
+        '''
+        utility function that returns the path a filetype is written to, with the compression file ending
+        '''
+        flpath = self.outputfolder.joinpath(output_filename).with_suffix(f'.{fltype}')
+        if fltype in ('csv', 'json') and self.compression is not None:
+            flpath = flpath.with_name(flpath.name + compressions[self.compression])
+        return flpath
+
+    def _write_file(self, dataframe:pd.DataFrame, output_filename:str, fltype:str, write_mode:str):
+        '''
+        utility function that writes one filetype and returns the bytes written (None if there was
+        nothing new to write) and the seconds it took
+        '''
+        flpath = self._output_path(output_filename, fltype)
+        start = time.perf_counter()
+        with timed_stage(self.metrics, 'write', series=output_filename, fltype=fltype) as record:
+            nbytes = self._write_fltype(dataframe, flpath, fltype, write_mode)
+            if self.metrics is not None:
+                record['bytes_out'] = nbytes or 0
+        return nbytes, time.perf_counter() - start
+
+    def _write_fltype(self, dataframe:pd.DataFrame, flpath:Path, fltype:str, write_mode:str):
+        '''
+        utility function that writes the dataframe to one filetype and returns the bytes written, or
+        None if there was nothing new. When appending only the dates after the last date in the file
+        get written (if the columns changed the whole file is rewritten instead). csv files get the new
+        lines added to the end of a copy of the file (compressed csv files get a new compressed part,
+        which gzip and zstd read as one file) and parquet gets a new part file in the `.parquet` folder,
+        json and feather can't be appended to so they get rewritten with the old and new rows.
+
+        Every file is written to a temporary file and renamed, so readers see the old or the new file.
+        A parquet rewrite goes to a new hidden version folder and the `.parquet` link to it is replaced
+        (only the first rewrite of a plain `.parquet` folder from before the links has a short gap)
+        '''
+        append_rows = None
+        if write_mode != 'overwrite' and flpath.exists():
+            existing = read_dataframe(flpath)
+            append_rows = dataframe[dataframe.index > existing.index.max()]
+            rewrite = set(dataframe.columns) != set(existing.columns) # new columns can't be appended
+            if write_mode == 'upsert' and not rewrite:
+                overlap = dataframe[dataframe.index.isin(existing.index)]
+                old_values = existing.reindex(index=overlap.index, columns=overlap.columns)
+                rewrite = (old_values.to_numpy() != overlap.to_numpy()).any()
+            if rewrite:
+                # the columns or some of the old values changed so the whole file gets rewritten
+                dataframe = pd.concat([existing[~existing.index.isin(dataframe.index)], dataframe]).sort_index()
+                append_rows = None
+            if append_rows is not None:
+                if append_rows.empty:
+                    return None
+                append_rows = append_rows.reindex(columns=existing.columns)
+                if fltype in ('json', 'feather'):
+                    dataframe, append_rows = pd.concat([existing, append_rows]), None
+
+        if fltype == 'json':
+            # the default json layout is keyed by date so data with repeated dates is written split
+            orient = 'columns' if dataframe.index.is_unique else 'split'
+            data = _compress(dataframe.to_json(orient=orient).encode(), self.compression)
+            _atomic_write(flpath, data)
+        elif fltype == 'csv':
+            if append_rows is None:
+                data = _compress(dataframe.to_csv().encode(), self.compression)
+                _atomic_write(flpath, data)
+            else:
+                # the new lines are added to a copy of the file which then replaces it. Copying the
+                # bytes is much cheaper than rendering the old rows again
+                data = _compress(append_rows.to_csv(header=False).encode(), self.compression)
+                tmp_path = flpath.with_name(f'.{flpath.name}.tmp')
+                shutil.copyfile(flpath, tmp_path)
+                with open(tmp_path, 'ab') as flobj:
+                    flobj.write(data)
+                os.replace(tmp_path, flpath)
+        elif fltype == 'parquet':
+            compact = _compact_dataframe(dataframe if append_rows is None else append_rows)
+            part_name = f'part-{compact.index[0]:%Y%m%d}.parquet'
+            parquet_compression = self.compression or 'snappy'
+            if append_rows is not None:
+                tmp_part = flpath.joinpath(f'.{part_name}.tmp') # hidden files are skipped by read_parquet
+                compact.to_parquet(tmp_part, compression=parquet_compression)
+                os.replace(tmp_part, flpath.joinpath(part_name))
+                return flpath.joinpath(part_name).stat().st_size
+            # `<name>.parquet` is a link to a hidden version folder. The new version is written to its
+            # own folder and the link is replaced in one rename, so readers see the old or new version
+            version_folder = Path(tempfile.mkdtemp(dir=flpath.parent, prefix=f'.{flpath.name}.'))
+            compact.to_parquet(version_folder.joinpath(part_name), compression=parquet_compression)
+            previous = flpath.resolve() if flpath.is_symlink() else None
+            if flpath.is_dir() and not flpath.is_symlink():
+                # a plain folder can't be replaced by a link in one rename, so it is moved out of the way
+                previous = flpath.with_name(f'.{flpath.name}.old')
+                if previous.is_dir(): shutil.rmtree(previous)
+                os.replace(flpath, previous)
+            tmp_link = flpath.with_name(f'.{flpath.name}.link')
+            if tmp_link.is_symlink(): tmp_link.unlink()
+            os.symlink(version_folder.name, tmp_link) # relative so the output folder can be moved
+            os.replace(tmp_link, flpath)
+            # the version that was just replaced is kept for readers still reading it, older ones are removed
+            for old_version in flpath.parent.glob(f'.{flpath.name}.*'):
+                if old_version.is_dir() and not old_version.is_symlink() and old_version not in (version_folder, previous):
+                    shutil.rmtree(old_version, ignore_errors=True)
+            return _path_size(flpath)
+        elif fltype == 'feather':
+            # uncompressed so it can be memory mapped when it is read back in
+            tmp_path = flpath.with_name(f'.{flpath.name}.tmp')
+            _compact_dataframe(dataframe).reset_index().to_feather(tmp_path, compression='uncompressed')
+            os.replace(tmp_path, flpath)
+            return flpath.stat().st_size
+        return len(data)
+
+    def load_dataframe(self, output_filename:str, fltype:str='csv'):
+        '''
+        load a dataframe written by one of the scrapers from the output folder. See `read_dataframe`
+        '''
+        return read_dataframe(self._output_path(output_filename, fltype))
+
+    def scrape_widgets(self, names=None, fltypes=('csv', 'json'), return_dataframes:bool=False):
+        '''scrape the series in `self.widget_specs` from one pass over the page. Each series is saved
+        using its name as the filename
+
+        Parameters:
+
+            names:list
+                the series to scrape. `None` scrapes all of them
+            fltypes:[list or str]
+                will save out either csv, json or both filetypes. use `None` to not write anything
+            return_dataframes:bool
+                will return either the dataframes or a true/false on write success
+        ----
+        Returns:
+
+            dictionary of series name: dataframe (or write success)
+        '''
+        if self.widgets is None:
+            self.index_widgets()
+        with timed_stage(self.metrics, 'clean', series='widgets') as record:
+            frames = self.widget_extractor.extract(self.widgets, names, self._date_cache)
+            record['rows'] = sum(len(dataframe) for dataframe in frames.values())
+        write_success = {name: self._write_scraped(dataframe, name, fltypes,
+                                                   self._write_key(fltypes, self.widget_specs.get(name)))
+                         for name, dataframe in frames.items()}
+        return frames if return_dataframes else write_success
+
     def scrape_all(self, totalfl:str='alberta_total_data', regionsfl:str='alberta_region_data',
                    testfl:str='alberta_testing_data', fltypes=('csv', 'json'),
                    combine_dataframes:bool=False, return_dataframes:bool=False):
@@ -337,9 +1172,11 @@ class albertaC19():
                 if combine_dataframes = False
 
         '''
-        totals = self.scrape_albertaTotals(output_filename=totalfl, fltypes=fltypes, return_dataframe=return_dataframes)
-        regions = self.scrape_albertaRegions(output_filename=regionsfl, fltypes=fltypes, return_dataframe=return_dataframes)
-        testing = self.scrape_albertaTesting(output_filename=testfl, fltypes=fltypes, return_dataframe=return_dataframes)
+        # the three series go into the store in one transaction
+        with self.store.transaction() if fltypes and 'sqlite' in fltypes else nullcontext():
+            totals = self.scrape_albertaTotals(output_filename=totalfl, fltypes=fltypes, return_dataframe=return_dataframes)
+            regions = self.scrape_albertaRegions(output_filename=regionsfl, fltypes=fltypes, return_dataframe=return_dataframes)
+            testing = self.scrape_albertaTesting(output_filename=testfl, fltypes=fltypes, return_dataframe=return_dataframes)
         if combine_dataframes:
             all_data = totals.join([regions, testing])
             return all_data